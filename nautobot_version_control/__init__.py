@@ -4,10 +4,19 @@
 from importlib import metadata
 
 import django_tables2
-from django.db.models.signals import post_migrate, pre_migrate
+from celery.signals import task_postrun
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_migrate, post_save, pre_delete, pre_migrate
 from nautobot.apps import NautobotAppConfig
 
 from nautobot_version_control.migrations import auto_dolt_commit_migration
+from nautobot_version_control.signals import branch_head_moved
+from nautobot_version_control.utils import (
+    close_revision_connections,
+    reset_checked_out_branch,
+    track_revision_connection,
+)
 
 __version__ = metadata.version(__name__)
 
@@ -33,6 +42,21 @@ class NautobotVersionControlConfig(NautobotAppConfig):
         ],
         "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
         "CACHEOPS_ENABLED": False,
+        # Cache for diff results, see `nautobot_version_control.diff_cache`.
+        "diff_cache_backend": "nautobot_version_control.diff_cache.LocalDiffCache",
+        "diff_cache_options": {},
+        # Number of threads used to compute diff summaries, 0 computes them sequentially.
+        "diff_parallelism": 0,
+        # Compute diffs from the cached diff to an earlier commit of the same branch, see `diffs.incremental_base`.
+        "diff_incremental": False,
+        # Maximum number of database aliases registered for commit and branch revisions, see `utils.db_for_commit`.
+        "max_revision_databases": 64,
+        # How merge candidates are built in the background: "celery", "thread" or "inline".
+        "merge_candidate_builder": "celery",
+        # Coalesce automatic commits: commit once this many requests are pending, see `autocommit`.
+        "auto_commit_batch_size": 1,
+        # Coalesce automatic commits: commit this many seconds after the first pending request, 0 disables it.
+        "auto_commit_batch_interval": 0,
     }
     middleware = [
         "nautobot_version_control.middleware.dolt_health_check_intercept_middleware",
@@ -51,6 +75,31 @@ class NautobotVersionControlConfig(NautobotAppConfig):
         # make a Dolt commit to save database migrations.
         post_migrate.connect(auto_dolt_commit_migration, sender=self)
 
+        # forget the checked out branch whenever a database connection is (re)opened.
+        connection_created.connect(reset_checked_out_branch, dispatch_uid="dolt_reset_checked_out_branch")
+
+        # close connections to revision databases once the request or task that opened them is done.
+        connection_created.connect(track_revision_connection, dispatch_uid="dolt_track_revision_connection")
+        request_finished.connect(close_revision_connections, dispatch_uid="dolt_close_revision_connections")
+        task_postrun.connect(close_revision_connections, dispatch_uid="dolt_close_revision_connections")
+
+        # rebuild the merge candidates of pull requests in the background whenever one of their branches moves.
+        from nautobot_version_control.merge import (  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+            schedule_merge_candidates,
+        )
+
+        branch_head_moved.connect(schedule_merge_candidates, dispatch_uid="dolt_schedule_merge_candidates")
+
+        # collect changes for automatic Dolt commits, routed to the `AutoDoltCommit` of the current request.
+        from nautobot_version_control.middleware import (  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+            handle_auto_dolt_commit_delete,
+            handle_auto_dolt_commit_update,
+        )
+
+        post_save.connect(handle_auto_dolt_commit_update, dispatch_uid="dolt_commit_update")
+        m2m_changed.connect(handle_auto_dolt_commit_update, dispatch_uid="dolt_commit_update")
+        pre_delete.connect(handle_auto_dolt_commit_delete, dispatch_uid="dolt_commit_delete")
+
 
 config = NautobotVersionControlConfig  # pylint:disable=invalid-name
 
@@ -99,11 +148,14 @@ __VERSIONED_MODEL_REGISTRY___ = {
         "pullrequestreviewcomments": False,
         "pullrequestreviews": False,
         "branchmeta": False,
+        "mergecandidate": False,
         "branch": False,
         # todo: calling the following "versioned" is odd.
         #   their contents are parameterized by branch
         #   changes, but they are not under VCS.
         "commit": True,
+        # recorded in the commits they describe
+        "commitchange": True,
         "commitancestor": True,
         "conflicts": True,
         "constraintviolations": True,
@@ -2,18 +2,29 @@
 
 from rest_framework import serializers
 
+from nautobot_version_control import graph
 from nautobot_version_control.models import Branch, Commit, PullRequest, PullRequestReview
 
 
 class BranchSerializer(serializers.ModelSerializer):
     """BranchSerializer serializes a Branch."""
 
+    ahead_behind = serializers.SerializerMethodField(read_only=True)
+
     class Meta:
         """Set Meta Data for BranchSerializer, will serialize all fields."""
 
         model = Branch
         fields = "__all__"
 
+    def get_ahead_behind(self, obj):
+        """Returns the ahead/behind counts, precomputed in bulk by BranchViewSet when available."""
+        counts = self.context.get("ahead_behind") or {}
+        if obj.name not in counts:
+            counts = graph.ahead_behind([obj])
+        ahead, behind = counts[obj.name]
+        return {"ahead": ahead, "behind": behind}
+
 
 class CommitSerializer(serializers.ModelSerializer):
     """CommitSerializer serializes a Commit."""
@@ -28,6 +39,9 @@ class CommitSerializer(serializers.ModelSerializer):
 class PullRequestSerializer(serializers.ModelSerializer):
     """PullRequestSerializer serializes a PullRequest."""
 
+    status = serializers.CharField(read_only=True)
+    num_reviews = serializers.IntegerField(read_only=True)
+
     class Meta:
         """Set Meta Data for PullRequestSerializer, will serialize all fields."""
 
@@ -3,8 +3,9 @@
 from nautobot.extras.api.views import CustomFieldModelViewSet
 from rest_framework.routers import APIRootView
 
-from nautobot_version_control import filters
+from nautobot_version_control import filters, graph
 from nautobot_version_control.models import Branch, Commit, PullRequest, PullRequestReview
+from nautobot_version_control.pagination import CommitKeysetPagination
 
 from . import serializers
 
@@ -25,10 +26,22 @@ class VCSRootView(APIRootView):
 class BranchViewSet(CustomFieldModelViewSet):  # pylint: disable=too-many-ancestors
     """BranchViewSet render a view for the Branch model."""
 
-    queryset = Branch.objects.all()
+    queryset = Branch.objects.with_meta()
     serializer_class = serializers.BranchSerializer
     filterset_class = filters.BranchFilterSet
 
+    def paginate_queryset(self, queryset):
+        """Computes ahead/behind counts for the whole page at once."""
+        page = super().paginate_queryset(queryset)
+        self.ahead_behind = graph.ahead_behind(page if page is not None else queryset)  # pylint: disable=W0201
+        return page
+
+    def get_serializer_context(self):
+        """Passes the precomputed ahead/behind counts to the serializer."""
+        context = super().get_serializer_context()
+        context["ahead_behind"] = getattr(self, "ahead_behind", None)
+        return context
+
 
 #
 # Commits
@@ -41,6 +54,7 @@ class CommitViewSet(CustomFieldModelViewSet):  # pylint: disable=too-many-ancest
     queryset = Commit.objects.all()
     serializer_class = serializers.CommitSerializer
     filterset_class = filters.CommitFilterSet
+    pagination_class = CommitKeysetPagination
 
 
 #
@@ -51,7 +65,7 @@ class CommitViewSet(CustomFieldModelViewSet):  # pylint: disable=too-many-ancest
 class PullRequestViewSet(CustomFieldModelViewSet):  # pylint: disable=too-many-ancestors
     """PullRequestViewSet render a view for the PullRequest model."""
 
-    queryset = PullRequest.objects.all()
+    queryset = PullRequest.objects.with_status()
     serializer_class = serializers.PullRequestSerializer
     filterset_class = filters.PullRequestFilterSet
 
@@ -0,0 +1,162 @@
+"""Autocommit.py coalesces the automatic Dolt commits of several requests on a branch.
+
+By default every write request is committed on its own, see `middleware.AutoDoltCommit`. With the
+`auto_commit_batch_size` and `auto_commit_batch_interval` settings in
+`PLUGINS_CONFIG["nautobot_version_control"]`, changes stay in the working set of their branch and are
+committed together once `auto_commit_batch_size` requests are pending, or `auto_commit_batch_interval`
+seconds after the first pending request. A request with the `dolt-commit` header commits all pending
+changes of its branch immediately.
+
+The pending requests of each branch are tracked in the Django cache, so that every web server process
+and worker shares them.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.cache import cache
+
+from nautobot_version_control.constants import AUTO_COMMIT_SAMPLE_SIZE
+from nautobot_version_control.models import Commit, CommitChange
+from nautobot_version_control.signals import branch_head_moved
+from nautobot_version_control.utils import author_from_user, db_for_branch, get_app_setting
+
+logger = logging.getLogger(__name__)
+
+# Pending changes are forgotten after this many seconds, their data is committed by the next commit anyway.
+AUTO_COMMIT_STATE_TIMEOUT = 60 * 60 * 24
+# The lock of a branch is held for at most this many seconds, e.g. by a flush.
+AUTO_COMMIT_FLUSH_TIMEOUT = 60
+# Seconds between attempts to take the lock of a branch.
+AUTO_COMMIT_LOCK_POLL = 0.05
+
+
+def is_batching():
+    """Returns `True` if automatic commits are coalesced, as configured by the `auto_commit_batch_*` settings."""
+    return (get_app_setting("auto_commit_batch_size") or 1) > 1 or bool(get_app_setting("auto_commit_batch_interval"))
+
+
+def defer_commit(branch, changes, objects, user, force=False):
+    """
+    Records the changes of a request on `branch`, and commits the pending changes once the batch is full.
+
+    :param branch: the name of the branch the changes were made on
+    :param changes: a dict mapping (action, model) pairs to [count, object names], see `AutoDoltCommit`
+    :param objects: the (action, model label, pk) keys of every changed object
+    :param user: the User who made the changes
+    :param force: commit immediately, e.g. when the request has the `dolt-commit` header
+    :return: `True` if the pending changes were committed
+    """
+    key = _state_key(branch)
+    with branch_lock(branch):
+        # pending changes wait in the working set of the branch, they are part of the next commit
+        CommitChange.objects.using(db_for_branch(branch)).bulk_create(
+            [CommitChange(action=action, model=label, object_id=pk) for action, label, pk in objects],
+            batch_size=1000,
+        )
+        state = cache.get(key) or {"requests": 0, "since": time.time(), "authors": [], "changes": {}}
+        state["requests"] += 1
+        author = author_from_user(user)
+        if author not in state["authors"]:
+            state["authors"].append(author)
+        for (action, model), (count, names) in changes.items():
+            pending = state["changes"].setdefault(f"{action}:{model._meta.label_lower}", [0, []])
+            pending[0] += count
+            pending[1].extend(names[: AUTO_COMMIT_SAMPLE_SIZE - len(pending[1])])
+        cache.set(key, state, timeout=AUTO_COMMIT_STATE_TIMEOUT)
+
+    if force or state["requests"] >= (get_app_setting("auto_commit_batch_size") or 1):
+        return flush(branch)
+    if state["requests"] == 1:
+        schedule_flush(branch)
+    return False
+
+
+def schedule_flush(branch, countdown=None):
+    """Commits the pending changes of `branch` in a Celery worker, `auto_commit_batch_interval` seconds from now."""
+    interval = get_app_setting("auto_commit_batch_interval")
+    if not interval:
+        return
+    # tasks.py imports this module
+    from nautobot_version_control.tasks import (  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+        flush_auto_commit_task,
+    )
+
+    try:
+        flush_auto_commit_task.apply_async(args=[branch], countdown=interval if countdown is None else countdown)
+    except Exception:  # pylint: disable=broad-except
+        # best effort, e.g. the broker is unavailable: the changes are committed with the next batch
+        logger.exception("failed to schedule the automatic commit of branch %s", branch)
+
+
+def flush_if_due(branch):
+    """Commits the pending changes of `branch` if the oldest has been pending for `auto_commit_batch_interval` seconds."""
+    state = cache.get(_state_key(branch))
+    if not state:
+        return False
+    remaining = state["since"] + (get_app_setting("auto_commit_batch_interval") or 0) - time.time()
+    if remaining > 0:
+        # a batch flushed by size was followed by a new one, wait for it to be due
+        schedule_flush(branch, countdown=remaining)
+        return False
+    return flush(branch)
+
+
+def flush(branch):
+    """
+    Commits the pending changes of `branch`, with a message combining the changes and authors of every pending request.
+
+    The commit is made on a connection to the branch, see `utils.db_for_branch()`.
+    :return: `True` if the pending changes were committed
+    """
+    key = _state_key(branch)
+    with branch_lock(branch):
+        # a flush that held the lock before committed everything that was pending then
+        state = cache.get(key)
+        if not state:
+            return False
+        commit = Commit(message=commit_message(state))
+        commit.save(author=state["authors"][0], using=db_for_branch(branch))
+        cache.delete(key)
+    branch_head_moved.send(sender=Commit, branch=branch)
+    return True
+
+
+@contextmanager
+def branch_lock(branch):
+    """
+    Holds the lock of the pending changes of `branch`, shared by every process through the Django cache.
+
+    The lock expires after `AUTO_COMMIT_FLUSH_TIMEOUT` seconds, so a process that died holding it
+    only blocks the branch that long.
+    """
+    lock = f"{_state_key(branch)}.lock"
+    while not cache.add(lock, True, timeout=AUTO_COMMIT_FLUSH_TIMEOUT):
+        time.sleep(AUTO_COMMIT_LOCK_POLL)
+    try:
+        yield
+    finally:
+        cache.delete(lock)
+
+
+def commit_message(state):
+    """Returns the commit message for the pending changes `state` of a branch."""
+    # middleware.py imports this module
+    from nautobot_version_control.middleware import (  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+        AutoDoltCommit,
+    )
+
+    msgs = []
+    for change, (count, names) in state["changes"].items():
+        action, label = change.split(":", 1)
+        msgs.append(AutoDoltCommit.change_msg(action, apps.get_model(label), count, names))
+    msg = "; ".join(msgs)
+    if len(state["authors"]) > 1:
+        msg += f" (authors: {', '.join(state['authors'])})"
+    return msg
+
+
+def _state_key(branch):
+    return f"nautobot_version_control.auto_commit.{branch}"
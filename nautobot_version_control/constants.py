@@ -1,5 +1,7 @@
 """Constants.py defines several important constants used throughout the plugin."""
 
+import re
+
 # TODO: move these to settings?
 
 DB_NAME = "nautobot"
@@ -9,3 +11,15 @@ GLOBAL_DB = "global"
 DOLT_DEFAULT_BRANCH = "main"
 
 DOLT_BRANCH_KEYWORD = "dolt-branch"
+
+# Request header asking for the pending automatic commits of the branch to be made immediately.
+DOLT_COMMIT_KEYWORD = "dolt-commit"
+
+# Number of object names listed per model in the message of an automatic commit.
+AUTO_COMMIT_SAMPLE_SIZE = 5
+
+# Matches the object count of a change in an automatic commit message, e.g. "Created 3 devices: d1, d2, d3".
+CHANGE_COUNT_RE = re.compile(r"\s*(?:Created|Updated|Deleted) (\d+) ")
+
+# Matches a full Dolt commit hash, 32 characters of base32 with the alphabet 0-9a-v.
+COMMIT_HASH_RE = re.compile(r"[0-9a-v]{32}")
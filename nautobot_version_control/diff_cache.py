@@ -0,0 +1,134 @@
+"""Diff_cache.py contains a content-addressed cache for Dolt diff results.
+
+Dolt commit hashes are immutable, so the diff between two commits never changes. Results are
+keyed on (from_commit, to_commit, table, kind), where `kind` distinguishes the different results
+computed for a table, e.g. its diff rows or its diff summary.
+
+The backend is configured with the `diff_cache_backend` and `diff_cache_options` settings in
+`PLUGINS_CONFIG["nautobot_version_control"]`. `diff_cache_backend` is the dotted path of a
+`DiffCache` subclass, or `None` to disable caching.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from nautobot_version_control.utils import get_app_setting, is_commit_hash
+
+_diff_cache = None
+_diff_cache_lock = threading.Lock()
+
+
+class DiffCache:
+    """DiffCache is the base class for diff result caches."""
+
+    def get(self, from_commit, to_commit, table, kind):
+        """Returns the cached value, or `None` if it is not cached."""
+        raise NotImplementedError
+
+    def set(self, from_commit, to_commit, table, kind, value):
+        """Caches `value`."""
+        raise NotImplementedError
+
+    def get_or_compute(self, from_commit, to_commit, table, kind, compute):
+        """Returns the cached value, computing and caching it with `compute()` on a miss.
+
+        Only diffs between commit hashes are cached, diffs between branch names or
+        other revision specs are always computed as their content can change.
+        """
+        if not (is_commit_hash(from_commit) and is_commit_hash(to_commit)):
+            return compute()
+        value = self.get(from_commit, to_commit, table, kind)
+        if value is None:
+            value = compute()
+            self.set(from_commit, to_commit, table, kind, value)
+        return value
+
+    @staticmethod
+    def make_key(from_commit, to_commit, table, kind):
+        """Returns the cache key for a diff result."""
+        return f"nautobot_version_control.diff.{from_commit}.{to_commit}.{table}.{kind}"
+
+
+class NullDiffCache(DiffCache):
+    """NullDiffCache never caches anything."""
+
+    def get(self, from_commit, to_commit, table, kind):  # noqa: D102
+        return None
+
+    def set(self, from_commit, to_commit, table, kind, value):  # noqa: D102
+        return
+
+
+class LocalDiffCache(DiffCache):
+    """
+    LocalDiffCache is an in-process LRU cache.
+
+    Entries are evicted least-recently-used first once either `max_entries` entries or
+    `max_size` cached diff rows are exceeded.
+    """
+
+    def __init__(self, max_entries=1024, max_size=100000):
+        """The init method for LocalDiffCache."""
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, from_commit, to_commit, table, kind):  # noqa: D102
+        key = self.make_key(from_commit, to_commit, table, kind)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def set(self, from_commit, to_commit, table, kind, value):  # noqa: D102
+        key = self.make_key(from_commit, to_commit, table, kind)
+        size = self.entry_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_size):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    @staticmethod
+    def entry_size(value):
+        """Returns the size of a cached value, measured in diff rows."""
+        try:
+            return max(len(value), 1)
+        except TypeError:
+            return 1
+
+
+class DjangoDiffCache(DiffCache):
+    """DjangoDiffCache stores diff results in one of the caches defined in Django's `CACHES` setting."""
+
+    def __init__(self, alias="default", timeout=60 * 60 * 24):
+        """The init method for DjangoDiffCache."""
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, from_commit, to_commit, table, kind):  # noqa: D102
+        return self.cache.get(self.make_key(from_commit, to_commit, table, kind))
+
+    def set(self, from_commit, to_commit, table, kind, value):  # noqa: D102
+        self.cache.set(self.make_key(from_commit, to_commit, table, kind), value, timeout=self.timeout)
+
+
+def get_diff_cache():
+    """Returns the configured diff cache."""
+    global _diff_cache  # pylint: disable=global-statement  # noqa: PLW0603
+    if _diff_cache is None:
+        with _diff_cache_lock:
+            if _diff_cache is None:
+                backend = get_app_setting("diff_cache_backend")
+                options = get_app_setting("diff_cache_options") or {}
+                _diff_cache = import_string(backend)(**options) if backend else NullDiffCache()
+    return _diff_cache
@@ -1,8 +1,14 @@
 """Diffs.py contains a set of utilities for producing Dolt diffs."""
 
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 from django.contrib.contenttypes.models import ContentType
-from django.db import connection, models
-from django.db.models.expressions import RawSQL
+from django.db import connection, connections
+from django.urls import reverse
 from nautobot.circuits import tables as circuits_tables
 from nautobot.dcim.tables import cables, devices, devicetypes, locations, power, racks
 from nautobot.extras import tables as extras_tables
@@ -10,9 +16,12 @@ from nautobot.ipam import tables as ipam_tables
 from nautobot.tenancy import tables as tenancy_tables
 from nautobot.virtualization import tables as virtualization_tables
 
+from nautobot_version_control import graph
+from nautobot_version_control.diff_cache import get_diff_cache
 from nautobot_version_control.dynamic.diff_factory import DiffListViewFactory
 from nautobot_version_control.models import Commit
-from nautobot_version_control.utils import db_for_commit
+from nautobot_version_control.pagination import PagedTableData
+from nautobot_version_control.utils import db_for_commit, get_app_setting, is_commit_hash, table_columns
 
 from . import diff_table_for_model, register_diff_tables
 
@@ -26,113 +35,447 @@ def three_dot_diffs(from_commit=None, to_commit=None):
 
 
 def two_dot_diffs(from_commit=None, to_commit=None):
-    """Returns the diff between from_commit and to_commit via the dolt diff table interface."""
+    """
+    Returns the diff summary between from_commit and to_commit via the dolt diff table interface.
+
+    Only the per-table summary is computed, the changed rows of each table are loaded on
+    demand with `diff_table()`. With the `diff_incremental` setting, the diff is computed from the
+    cached diff to an earlier `to_commit`, see `incremental_base()`.
+    """
     if not (from_commit and to_commit):
         raise ValueError("must specify both a to_commit and from_commit")
+    if is_incremental(from_commit, to_commit):
+        record_diff_head(from_commit, to_commit)
 
-    diff_results = []
+    # only query the diff tables of tables that actually changed
+    changed = changed_tables(from_commit, to_commit)
+
+    content_types = []
     for content_type in ContentType.objects.all():
         model = content_type.model_class()
         if not model:
             continue
+        if model._meta.db_table not in changed:
+            continue
         if not diff_table_for_model(model):
             continue
+        content_types.append(content_type)
 
-        ct_meta = content_type.model_class()._meta
-        tbl_name = ct_meta.db_table
-        verbose_name = str(ct_meta.verbose_name.capitalize())
-
-        to_queryset = (
-            content_type.model_class()
-            .objects.filter(
-                pk__in=RawSQL(  # TODO: not safe  # nosec  # noqa: S611
-                    f"""SELECT to_id FROM dolt_commit_diff_{tbl_name}
-                        WHERE to_commit = %s
-                        AND from_commit = %s""",  # nosec  # noqa: S608
-                    (to_commit, from_commit),
-                )
-            )
-            .annotate(
-                # Annotate each row with a JSON-ified diff
-                diff=RawSQL(  # TODO: not safe  # nosec  # noqa: S611
-                    f"""SELECT JSON_OBJECT("root", "to", {json_diff_fields(tbl_name)})
-                        FROM dolt_commit_diff_{tbl_name}
-                        WHERE to_commit = %s AND from_commit = %s
-                        AND to_id = {tbl_name}.id """,  # nosec  # noqa: S608
-                    (to_commit, from_commit),
-                    output_field=models.JSONField(),
-                )
-            )
-            # "time-travel" query the database at `to_commit`
-            .using(db_for_commit(to_commit))
-        )
+    tables = [content_type.model_class()._meta.db_table for content_type in content_types]
+    summaries = diff_summaries_for_tables(tables, from_commit, to_commit)
 
-        from_queryset = (
-            content_type.model_class()
-            .objects.filter(
-                # add the `diff_type = 'removed'` clause, because we only want deleted
-                # rows in this queryset. modified rows come from the `to_queryset`
-                pk__in=RawSQL(  # TODO: not safe  # nosec  # noqa: S611
-                    f"""SELECT from_id FROM dolt_commit_diff_{tbl_name}
-                        WHERE to_commit = %s AND from_commit = %s
-                        AND diff_type = 'removed' """,  # nosec  # noqa: S608
-                    (to_commit, from_commit),
-                )
-            )
-            .annotate(
-                # Annotate each row with a JSON-ified diff
-                diff=RawSQL(  # TODO: not safe  # noqa: S611
-                    f"""SELECT JSON_OBJECT("root", "from", {json_diff_fields(tbl_name)})
-                        FROM dolt_commit_diff_{tbl_name}
-                        WHERE to_commit = %s AND from_commit = %s
-                        AND from_id = {tbl_name}.id """,  # nosec  # noqa: S608
-                    (to_commit, from_commit),
-                    output_field=models.JSONField(),
-                )
-            )
-            # "time-travel" query the database at `from_commit`
-            .using(db_for_commit(from_commit))
-        )
-        diff_rows = sorted(list(to_queryset) + list(from_queryset), key=lambda d: d.pk)
-        if len(diff_rows) == 0:
+    diff_results = []
+    for content_type, summary in zip(content_types, summaries):
+        model = content_type.model_class()
+        count = summary["added"] + summary["modified"] + summary["removed"]
+        if count == 0:
             continue
 
-        diff_view_table = DiffListViewFactory(content_type).get_table_model()
+        verbose_name = str(model._meta.verbose_name.capitalize())
         diff_results.append(
             {
                 "name": f"{verbose_name} Diffs",
-                "table": diff_view_table(diff_rows),
-                **diff_summary_for_table(tbl_name, from_commit, to_commit),
+                "count": count,
+                "url": reverse(
+                    "plugins:nautobot_version_control:diff_table",
+                    kwargs={
+                        "from_commit": str(from_commit),
+                        "to_commit": str(to_commit),
+                        "app_label": content_type.app_label,
+                        "model": content_type.model,
+                    },
+                ),
+                **summary,
             }
         )
     return diff_results
 
 
-def diff_summary_for_table(table, from_commit, to_commit):
-    """Returns the diff summary for table, for the commits from_commit and to_commit."""
+def diff_table(content_type, from_commit, to_commit):
+    """Returns the diff table of a model between from_commit and to_commit, its rows are read lazily."""
+    diff_view_table = DiffListViewFactory(content_type).get_table_model()
+    return diff_view_table(DiffTableData(content_type, from_commit, to_commit), orderable=False)
+
+
+class DiffTableData(PagedTableData):
+    """
+    DiffTableData reads the changed rows of a model from Dolt one page at a time.
+
+    Rows are ordered by primary key. The number of rows is taken from the diff summary, so
+    paginating a diff table only ever reads the rows of the requested page.
+    """
+
+    def __init__(self, content_type, from_commit, to_commit):
+        """The init method for DiffTableData."""
+        super().__init__()
+        self.content_type = content_type
+        self.from_commit = str(from_commit)
+        self.to_commit = str(to_commit)
+        self._length = None
+
+    @property
+    def model(self):  # noqa: D102
+        return self.content_type.model_class()
+
+    def __len__(self):
+        """Returns the number of changed rows."""
+        if self._length is None:
+            summary = diff_summary_for_table(self.model._meta.db_table, self.from_commit, self.to_commit)
+            self._length = summary["added"] + summary["modified"] + summary["removed"]
+        return self._length
+
+    def _rows(self, offset, limit):
+        payloads = diff_payloads(self.model._meta.db_table, self.from_commit, self.to_commit, offset, limit)
+        return rows_for_payloads(self.model, payloads, self.from_commit, self.to_commit)
+
+
+def diff_rows_for_table(content_type, from_commit, to_commit):
+    """
+    Returns the changed rows of a model between from_commit and to_commit, ordered by primary key.
+
+    Each row is a model instance annotated with its JSON-ified diff as `row.diff`. Added and
+    modified rows are "time-travel" queried at `to_commit`, removed rows at `from_commit`.
+    """
+    model = content_type.model_class()
+    payloads = diff_payloads(model._meta.db_table, from_commit, to_commit)
+    return rows_for_payloads(model, payloads, from_commit, to_commit)
+
+
+def rows_for_payloads(model, payloads, from_commit, to_commit):
+    """Fetches the model instances for diff payloads and annotates each with its payload."""
+    pk_field = model._meta.pk
+    rows = []
+    for root, commit in (("to", to_commit), ("from", from_commit)):
+        by_pk = {pk_field.to_python(p[f"{root}_id"]): p for p in payloads if p["root"] == root}
+        if not by_pk:
+            continue
+        # "time-travel" query the database at `commit`
+        for pk, obj in model.objects.using(db_for_commit(commit)).in_bulk(list(by_pk)).items():
+            obj.diff = by_pk[pk]
+            rows.append(obj)
+    return sorted(rows, key=lambda d: d.pk)
+
+
+def diff_payloads(tbl_name, from_commit, to_commit, offset=None, limit=None, using="default"):  # pylint: disable=R0913  # noqa: PLR0913, PLR0917
+    """
+    Returns the JSON-ified diffs of the changed rows of `tbl_name` between from_commit and to_commit.
+
+    The diff table is read in a single scan. Removed rows are rooted at the "from" side of the diff,
+    added and modified rows at the "to" side. When `limit` is given only `limit` rows, ordered by
+    primary key and starting at `offset`, are returned.
+    """
+    from_commit, to_commit = str(from_commit), str(to_commit)
+    if limit is not None:
+        if is_incremental(from_commit, to_commit):
+            # incremental diffs keep every row of the diff, ordered by primary key
+            payloads = get_diff_cache().get(from_commit, to_commit, tbl_name, "payloads")
+            if payloads is not None:
+                return payloads[offset or 0 : (offset or 0) + limit]
+        return get_diff_cache().get_or_compute(
+            from_commit,
+            to_commit,
+            tbl_name,
+            f"payloads.{offset or 0}.{limit}",
+            partial(_diff_payloads, tbl_name, from_commit, to_commit, offset, limit, using),
+        )
+
+    if is_incremental(from_commit, to_commit):
+        payloads = get_diff_cache().get(from_commit, to_commit, tbl_name, "payloads")
+        if payloads is None:
+            payloads = _incremental_diff_payloads(tbl_name, from_commit, to_commit, using)
+            # only the rows of small diffs are kept for later diffs to build on
+            if len(payloads) <= _incremental_max_rows():
+                get_diff_cache().set(from_commit, to_commit, tbl_name, "payloads", payloads)
+        return payloads
+    compute = partial(_diff_payloads, tbl_name, from_commit, to_commit, using=using)
+    return get_diff_cache().get_or_compute(from_commit, to_commit, tbl_name, "payloads", compute)
+
+
+def _diff_payloads(tbl_name, from_commit, to_commit, offset=None, limit=None, using="default"):  # pylint: disable=R0913  # noqa: PLR0913, PLR0917
+    params = [str(to_commit), str(from_commit)]
+    page = ""
+    if limit is not None:
+        page = "ORDER BY COALESCE(to_id, from_id) LIMIT %s OFFSET %s"
+        params += [limit, offset or 0]
+    with connections[using].cursor() as cursor:
+        cursor.execute(  # TODO: not safe
+            f"""SELECT JSON_OBJECT(
+                    "root", IF(diff_type = 'removed', 'from', 'to'),
+                    {json_diff_fields(tbl_name, using)})
+                FROM dolt_commit_diff_{tbl_name}
+                WHERE to_commit = %s AND from_commit = %s
+                {page}""",  # nosec  # noqa: S608
+            params,
+        )
+        return [_load_payload(row[0]) for row in cursor.fetchall()]
+
+
+def _load_payload(payload):
+    if isinstance(payload, (bytes, str)):
+        return json.loads(payload)
+    return payload
+
+
+#
+# Incremental diffs
+#
+
+# Number of recent `to_commit`s remembered per `from_commit`, see `record_diff_head()`.
+DIFF_HEADS = 8
+
+# Default maximum number of changed rows of a table kept in the diff cache for later diffs to build on.
+DIFF_INCREMENTAL_MAX_ROWS = 10000
+
+_diff_heads_lock = threading.Lock()
+
+# Columns of the Dolt diff tables that describe the commits rather than the row.
+_COMMIT_COLUMNS = ("commit", "commit_date")
+
+
+def is_incremental(from_commit, to_commit):
+    """Returns `True` if the diff between from_commit and to_commit is computed incrementally."""
+    return bool(get_app_setting("diff_incremental")) and is_commit_hash(from_commit) and is_commit_hash(to_commit)
+
+
+def record_diff_head(from_commit, to_commit):
+    """Remembers that the diff between from_commit and to_commit was computed, so that later diffs can build on it."""
+    from_commit, to_commit = str(from_commit), str(to_commit)
+    with _diff_heads_lock:
+        heads = get_diff_cache().get(from_commit, "*", "*", "heads") or []
+        if to_commit in heads:
+            return
+        get_diff_cache().set(from_commit, "*", "*", "heads", [to_commit, *heads][:DIFF_HEADS])
+
+
+def incremental_base(from_commit, to_commit):
+    """
+    Returns the commit the diff between from_commit and to_commit is computed from, or `None`.
+
+    This is the closest ancestor `prev` of to_commit for which the diff from from_commit was computed
+    before, so that only the commits between `prev` and to_commit have to be diffed, see `fold_payloads()`.
+    """
+
+    def compute():
+        heads = get_diff_cache().get(from_commit, "*", "*", "heads") or []
+        commits = graph.commit_graph()
+        best, best_ahead = "", None
+        for head in heads:
+            if head == to_commit:
+                continue
+            ahead, behind = commits.ahead_behind(to_commit, head)
+            # the earlier head must be an ancestor of to_commit
+            if behind == 0 and (best_ahead is None or ahead < best_ahead):
+                best, best_ahead = head, ahead
+        return best
+
+    from_commit, to_commit = str(from_commit), str(to_commit)
+    return get_diff_cache().get_or_compute(from_commit, to_commit, "*", "base", compute) or None
+
+
+def _incremental_max_rows():
+    max_rows = get_app_setting("diff_incremental_max_rows")
+    return DIFF_INCREMENTAL_MAX_ROWS if max_rows is None else max_rows
+
+
+def _incremental_diff_payloads(tbl_name, from_commit, to_commit, using="default"):
+    prev = incremental_base(from_commit, to_commit)
+    if prev is not None:
+        if tbl_name in changed_tables(from_commit, prev):
+            base = get_diff_cache().get(from_commit, prev, tbl_name, "payloads")
+        else:
+            base = []
+        if base is not None:
+            delta = (
+                diff_payloads(tbl_name, prev, to_commit, using=using)
+                if tbl_name in changed_tables(prev, to_commit)
+                else []
+            )
+            return fold_payloads(base, delta, from_commit, to_commit)
+    return sorted(_diff_payloads(tbl_name, from_commit, to_commit, using=using), key=_payload_pk)
+
+
+def fold_payloads(base, delta, from_commit, to_commit):
+    """
+    Returns the diff payloads between from_commit and to_commit, ordered by primary key.
+
+    `base` are the payloads of the diff between from_commit and a commit `prev`, `delta` those of the
+    diff between `prev` and to_commit. The "from" side of a row comes from `base`, where it was first
+    changed, and its "to" side from `delta`, where it was last changed. Rows added then removed, or
+    modified back to their original values, are not part of the result.
+    """
+    folded = {_payload_pk(payload): payload for payload in base}
+    for change in delta:
+        pk = _payload_pk(change)
+        if pk not in folded:
+            # unchanged between from_commit and `prev`
+            folded[pk] = change
+            continue
+        payload = {key: value for key, value in folded[pk].items() if key.startswith("from_")}
+        payload.update((key, value) for key, value in change.items() if key.startswith("to_"))
+        folded[pk] = _rediff(payload)
+
+    dates = {
+        "from_commit_date": next((p.get("from_commit_date") for p in base), None),
+        "to_commit_date": next((p.get("to_commit_date") for p in delta), None),
+    }
+    payloads = []
+    for pk in sorted(folded):
+        if folded[pk] is None:
+            continue
+        payload = {**folded[pk], "from_commit": from_commit, "to_commit": to_commit}
+        payload.update((key, value) for key, value in dates.items() if value is not None)
+        payloads.append(payload)
+    return payloads
+
+
+def _rediff(payload):
+    """Sets the diff type and root of a payload combined from two diffs, or returns `None` if it has no changes."""
+    added = payload.get("from_id") is None
+    removed = payload.get("to_id") is None
+    if added and removed:
+        return None
+    if not (added or removed):
+        columns = [key[3:] for key in payload if key.startswith("to_") and key[3:] not in _COMMIT_COLUMNS]
+        if all(payload[f"to_{column}"] == payload.get(f"from_{column}") for column in columns):
+            return None
+    payload["diff_type"] = "added" if added else "removed" if removed else "modified"
+    payload["root"] = "from" if removed else "to"
+    return payload
+
+
+def _payload_pk(payload):
+    return str(payload["to_id"] if payload.get("to_id") is not None else payload.get("from_id"))
+
+
+def changed_tables(from_commit, to_commit):
+    """
+    Returns the set of tables with data changes between from_commit and to_commit.
+
+    Incremental diffs return the tables changed up to their `incremental_base()` or after it,
+    which may include tables whose changes cancel out.
+    """
+    compute = partial(_changed_tables, from_commit, to_commit)
+    prev = incremental_base(from_commit, to_commit) if is_incremental(from_commit, to_commit) else None
+    if prev is not None:
+        compute = partial(_incremental_changed_tables, from_commit, prev, to_commit)
+    return get_diff_cache().get_or_compute(str(from_commit), str(to_commit), "*", "tables", compute)
+
+
+def _incremental_changed_tables(from_commit, prev, to_commit):
+    return changed_tables(from_commit, prev) | changed_tables(prev, to_commit)
+
+
+def _changed_tables(from_commit, to_commit):
+    tables = set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """SELECT from_table_name, to_table_name, data_change
+                FROM dolt_diff_summary(%s, %s)""",
+            (str(from_commit), str(to_commit)),
+        )
+        for from_table, to_table, data_change in cursor.fetchall():
+            if not data_change:
+                continue
+            # renamed tables are reported under both names
+            tables.update(name for name in (from_table, to_table) if name)
+    return tables
+
+
+def diff_summaries_for_tables(tables, from_commit, to_commit):
+    """
+    Returns the diff summaries of `tables` for the commits from_commit and to_commit, in the order of `tables`.
+
+    When the `diff_parallelism` setting is greater than one, the summaries are computed by that many
+    worker threads, each querying the revision database of `to_commit` on its own connection.
+    """
+    workers = min(get_app_setting("diff_parallelism") or 0, len(tables))
+    if workers <= 1 or not is_commit_hash(str(to_commit)):
+        return [diff_summary_for_table(table, from_commit, to_commit) for table in tables]
+
+    using = db_for_commit(to_commit)
+    pending = queue.SimpleQueue()
+    for index, table in enumerate(tables):
+        pending.put((index, table))
+
+    def worker():
+        results = {}
+        try:
+            while True:
+                try:
+                    index, table = pending.get_nowait()
+                except queue.Empty:
+                    return results
+                results[index] = diff_summary_for_table(table, from_commit, to_commit, using=using)
+        finally:
+            # connections are thread-local, close those opened by this worker, e.g. by `changed_tables()`
+            connections.close_all()
+
+    summaries = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dolt-diff") as pool:
+        for future in [pool.submit(worker) for _ in range(workers)]:
+            summaries.update(future.result())
+    return [summaries[index] for index in range(len(tables))]
+
+
+def diff_summary_for_table(table, from_commit, to_commit, using="default"):
+    """
+    Returns the diff summary for table, for the commits from_commit and to_commit.
+
+    Incremental diffs count the rows of `diff_payloads()` when they can be folded from an earlier diff,
+    see `incremental_base()`. Otherwise they are counted in SQL, and the rows of tables with at most
+    `diff_incremental_max_rows` changes are kept for the next diff to build on.
+    """
+    compute = partial(_diff_summary_for_table, table, from_commit, to_commit, using)
+    if is_incremental(from_commit, to_commit):
+        compute = partial(_summarize_payloads, table, from_commit, to_commit, using)
+    return get_diff_cache().get_or_compute(str(from_commit), str(to_commit), table, "summary", compute)
+
+
+def _summarize_payloads(table, from_commit, to_commit, using="default"):
+    prev = incremental_base(from_commit, to_commit)
+    if prev is None or (
+        table in changed_tables(from_commit, prev)
+        and get_diff_cache().get(from_commit, prev, table, "payloads") is None
+    ):
+        # there are no rows to build on, counting them is cheaper than reading them
+        summary = _diff_summary_for_table(table, from_commit, to_commit, using)
+        if sum(summary.values()) <= _incremental_max_rows():
+            # keep the rows of small diffs for later diffs to build on
+            diff_payloads(table, from_commit, to_commit, using=using)
+        return summary
+
     summary = {
         "added": 0,
         "modified": 0,
         "removed": 0,
     }
-    with connection.cursor() as cursor:
+    for payload in diff_payloads(table, from_commit, to_commit, using=using):
+        summary[payload["diff_type"]] += 1
+    return summary
+
+
+def _diff_summary_for_table(table, from_commit, to_commit, using="default"):
+    summary = {
+        "added": 0,
+        "modified": 0,
+        "removed": 0,
+    }
+    with connections[using].cursor() as cursor:
         cursor.execute(  # TODO: not safe
             f"""SELECT diff_type, count(diff_type) FROM dolt_commit_diff_{table}  # nosec
                 WHERE to_commit = %s AND from_commit = %s
                 GROUP BY diff_type ORDER BY diff_type""",  # nosec  # noqa: S608
-            (to_commit, from_commit),
+            (str(to_commit), str(from_commit)),
         )
         for diff_type, count in cursor.fetchall():
             summary[diff_type] = count
     return summary
 
 
-def json_diff_fields(tbl_name):
+def json_diff_fields(tbl_name, using="default"):
     """Returns all of the column names for a model and turns them into to_ and from_ fields."""
-    with connection.cursor() as cursor:
-        cursor.execute(f"DESCRIBE dolt_commit_diff_{tbl_name}")  # TODO: not safe
-        cols = cursor.fetchall()
-    pairs = (f"'{c[0]}', dolt_commit_diff_{tbl_name}.{c[0]}" for c in cols)
+    cols = table_columns(f"dolt_commit_diff_{tbl_name}", using=using)
+    pairs = (f"'{col}', dolt_commit_diff_{tbl_name}.{col}" for col in cols)
     return ", ".join(pairs)
 
 
@@ -100,6 +100,10 @@ class PullRequestFilterSet(BaseFilterSet):
         method="search",
         label="Search",
     )
+    status = django_filters.MultipleChoiceFilter(
+        choices=PullRequest.PR_STATUS_CHOICES,
+        method="filter_status",
+    )
 
     class Meta:
         """Meta class attributes for PullRequestFilterSet."""
@@ -136,6 +140,12 @@ class PullRequestFilterSet(BaseFilterSet):
             | Q(creator__icontains=value)
         )
 
+    def filter_status(self, queryset, name, value):  # pylint: disable=unused-argument
+        """Filters pull requests on their status, see `PullRequestQuerySet.with_status()`."""
+        if not value:
+            return queryset
+        return queryset.with_status().filter(computed_status__in=value)
+
 
 class PullRequestDefaultOpenFilterSet(PullRequestFilterSet):
     """PullRequestDefaultOpenFilterSet returns a filter for the PullRequest model where the default search is state=OPEN."""
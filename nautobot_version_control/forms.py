@@ -229,6 +229,7 @@ class PullRequestFilterForm(forms.Form, BootstrapMixin):
     model = PullRequest
     q = forms.CharField(required=False, label="Search")
     state = forms.MultipleChoiceField(required=False, choices=PullRequest.PR_STATE_CHOICES)
+    status = forms.MultipleChoiceField(required=False, choices=PullRequest.PR_STATUS_CHOICES)
     creator = forms.ModelChoiceField(required=False, queryset=User.objects.all())
     reviewer = forms.ModelChoiceField(required=False, queryset=User.objects.all())
 
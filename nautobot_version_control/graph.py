@@ -0,0 +1,252 @@
+"""Graph.py contains utilities for computing branch ancestry over the Dolt commit graph.
+
+Queries run over `CommitGraph`, an in-process index of the parents and generation numbers of
+every commit. Commits are immutable, so the index is only ever extended: commits it does not know
+yet are loaded from `dolt_commit_ancestors` the first time they are queried. Walks are ordered
+by generation number, so they stop at the merge base instead of walking the whole history.
+The index of a process is dropped and rebuilt once it holds more than `commit_graph_max_commits` commits.
+"""
+
+import heapq
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db import connection
+
+from nautobot_version_control.constants import DOLT_DEFAULT_BRANCH
+from nautobot_version_control.utils import get_app_setting, is_commit_hash
+
+logger = logging.getLogger(__name__)
+
+# Commit hashes are immutable, so a (branch head, base head) pair always has the same answer.
+AHEAD_BEHIND_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Default maximum number of commits in the index of a process, see `commit_graph()`.
+COMMIT_GRAPH_MAX_COMMITS = 1000000
+
+# Flags painted on commits while walking the graph from two heads.
+_LEFT = 1
+_RIGHT = 2
+_STALE = 4
+
+_commit_graph = None
+_commit_graph_lock = threading.Lock()
+
+
+class CommitGraph:
+    """
+    CommitGraph indexes the parents and generation number of each commit.
+
+    The generation number of a commit is one more than the highest generation number of its
+    parents, so a commit always has a higher generation number than any of its ancestors.
+    """
+
+    # number of commits looked up per query when extending the index
+    batch_size = 500
+
+    def __init__(self):
+        """The init method for CommitGraph."""
+        self.parents = {}
+        self.generations = {}
+        self._lock = threading.Lock()
+
+    def update(self, heads):
+        """Indexes the commits reachable from `heads` that are not indexed yet."""
+        # a commit is numbered once all of its ancestors are indexed, so numbered commits can be walked
+        if all(head in self.generations for head in heads):
+            return
+        with self._lock:
+            missing = {head for head in heads if head not in self.generations}
+            if not missing:
+                # indexed by another thread meanwhile
+                return
+            if not self.parents:
+                # the first load reads the whole graph at once
+                self._add(_commit_ancestors())
+                missing -= self.parents.keys()
+            # walk back from the new heads until reaching indexed commits
+            while missing:
+                batch = list(missing)[: self.batch_size]
+                rows = _commit_ancestors(batch)
+                self._add(rows)
+                missing -= set(batch)
+                missing.update(parent for _, parent, _ in rows if parent and parent not in self.parents)
+                # commits without ancestor rows are unknown, index them as roots rather than looking them up again
+                for commit in batch:
+                    self.parents.setdefault(commit, ())
+            self._number(self.parents.keys() - self.generations.keys())
+
+    def merge_base(self, left, right):
+        """Returns the best common ancestor of the commits `left` and `right`, or `None` if they have none."""
+        if left == right:
+            return left
+        bases = []
+        for commit, flags in self._walk(left, right):
+            # a common ancestor of a common ancestor is never the best one
+            if flags == _LEFT | _RIGHT:
+                bases.append(commit)
+        return max(bases, key=lambda commit: (self.generations[commit], commit)) if bases else None
+
+    def ahead_behind(self, head, base):
+        """Returns the number of commits reachable from `head` but not `base`, and from `base` but not `head`."""
+        ahead = behind = 0
+        for _, flags in self._walk(head, base):
+            if flags == _LEFT:
+                ahead += 1
+            elif flags == _RIGHT:
+                behind += 1
+        return ahead, behind
+
+    def ahead(self, head, base):
+        """Returns the set of commits reachable from `head` but not from `base`."""
+        return {commit for commit, flags in self._walk(head, base) if flags == _LEFT}
+
+    def _walk(self, left, right):
+        """
+        Walks back from `left` and `right` in decreasing generation order, yielding (commit, flags) pairs.
+
+        Each commit is yielded once, with the flags of the heads it is reachable from, and `_STALE` if it is an
+        ancestor of a common ancestor. The walk stops once every remaining commit is reachable from both heads,
+        so it only visits the commits since their merge base.
+        """
+        self.update([left, right])
+        flags = {left: _LEFT}
+        flags[right] = flags.get(right, 0) | _RIGHT
+        heap = [(-self.generations[commit], commit) for commit in flags]
+        heapq.heapify(heap)
+        visited = set()
+        while heap and any(not flags[commit] & _STALE for _, commit in heap):
+            _, commit = heapq.heappop(heap)
+            if commit in visited:
+                continue
+            visited.add(commit)
+            commit_flags = flags[commit]
+            yield commit, commit_flags
+            if commit_flags & (_LEFT | _RIGHT) == _LEFT | _RIGHT:
+                # ancestors of a common ancestor are common ancestors too, but not the best ones
+                commit_flags |= _STALE
+            for parent in self.parents[commit]:
+                if flags.get(parent, 0) | commit_flags != flags.get(parent, 0):
+                    flags[parent] = flags.get(parent, 0) | commit_flags
+                    heapq.heappush(heap, (-self.generations[parent], parent))
+
+    def _add(self, rows):
+        parents = {}
+        for commit_hash, parent_hash, parent_index in rows:
+            parents.setdefault(commit_hash, []).append((parent_index, parent_hash))
+        for commit_hash, indexed in parents.items():
+            self.parents[commit_hash] = tuple(parent for _, parent in sorted(indexed) if parent)
+
+    def _number(self, commits):
+        """Computes the generation numbers of `commits`, whose ancestors are all indexed."""
+        for commit in commits:
+            stack = [commit]
+            while stack:
+                top = stack[-1]
+                if top in self.generations:
+                    stack.pop()
+                    continue
+                pending = [parent for parent in self.parents.get(top, ()) if parent not in self.generations]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                self.generations[top] = 1 + max((self.generations[p] for p in self.parents.get(top, ())), default=0)
+                self.parents.setdefault(top, ())
+                stack.pop()
+
+
+def commit_graph():
+    """
+    Returns the commit graph index of this process.
+
+    An index holding more than `commit_graph_max_commits` commits is replaced by an empty one, queries
+    already walking the previous index keep using it.
+    """
+    global _commit_graph  # pylint: disable=global-statement  # noqa: PLW0603
+    limit = get_app_setting("commit_graph_max_commits") or COMMIT_GRAPH_MAX_COMMITS
+    if _commit_graph is None or len(_commit_graph.generations) > limit:
+        with _commit_graph_lock:
+            if _commit_graph is not None and len(_commit_graph.generations) > limit:
+                logger.info("dropping the commit graph index of %d commits", len(_commit_graph.generations))
+                _commit_graph = None
+            if _commit_graph is None:
+                _commit_graph = CommitGraph()
+    return _commit_graph
+
+
+def merge_base(left, right):
+    """Returns the merge base of `left` and `right`, each either a commit hash or the name of a branch."""
+    return commit_graph().merge_base(_resolve(left), _resolve(right))
+
+
+def commits_ahead(head, base=DOLT_DEFAULT_BRANCH):
+    """Returns the hashes of the commits reachable from `head` but not from `base`, each either a commit hash or a branch name."""
+    return commit_graph().ahead(_resolve(head), _resolve(base))
+
+
+def ahead_behind(branches, base=DOLT_DEFAULT_BRANCH):
+    """
+    Computes the ahead/behind counts of each branch in `branches` relative to the `base` branch.
+
+    Ahead is the number of commits reachable from the branch but not from `base`, behind is
+    the number of commits reachable from `base` but not from the branch. Results are cached
+    on the (branch head, base head) hash pair, and cache misses only walk the commit graph
+    back to the merge base of each branch.
+
+    :param branches: an iterable of Branch objects
+    :param base: the name of the branch to compare against
+    :return: a dict mapping branch names to (ahead, behind) tuples
+    """
+    branches = list(branches)
+    if not branches:
+        return {}
+    base_hash = next((b.hash for b in branches if b.name == base), None) or _branch_head(base)
+
+    keys = {b.name: _cache_key(b.hash, base_hash) for b in branches}
+    cached = cache.get_many(list(keys.values()))
+    counts = {b.name: tuple(cached[keys[b.name]]) for b in branches if keys[b.name] in cached}
+
+    missing = [b for b in branches if b.name not in counts]
+    if missing:
+        graph = commit_graph()
+        graph.update([base_hash, *(b.hash for b in missing)])
+        computed = {}
+        for branch in missing:
+            counts[branch.name] = graph.ahead_behind(branch.hash, base_hash)
+            computed[keys[branch.name]] = counts[branch.name]
+        cache.set_many(computed, timeout=AHEAD_BEHIND_CACHE_TIMEOUT)
+    return counts
+
+
+def _commit_ancestors(commits=None):
+    """Returns the (commit, parent, parent index) rows of `commits`, or of every commit in the database."""
+    with connection.cursor() as cursor:
+        if commits is None:
+            cursor.execute("SELECT commit_hash, parent_hash, parent_index FROM dolt_commit_ancestors;")
+        else:
+            cursor.execute(
+                f"""SELECT commit_hash, parent_hash, parent_index FROM dolt_commit_ancestors
+                    WHERE commit_hash IN ({", ".join(["%s"] * len(commits))});""",  # nosec  # noqa: S608
+                list(commits),
+            )
+        return cursor.fetchall()
+
+
+def _resolve(revision):
+    revision = str(revision)
+    # a branch may be named like a commit hash, the branch wins as in Dolt
+    head = _branch_head(revision)
+    return revision if head is None and is_commit_hash(revision) else head
+
+
+def _branch_head(name):
+    """Returns the head commit hash of the branch `name`, or `None` if there is no such branch."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT hash FROM dolt_branches WHERE name = %s;", [name])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _cache_key(head, base_head):
+    return f"nautobot_version_control.ahead_behind.{head}.{base_head}"
@@ -1,66 +1,96 @@
 """Merge.py contains utilities for the merging two branches and detecting any conflicts."""
 
 import json
-
-from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import connection
-from django.db.models import Sum
-
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+from nautobot_version_control import procedures
 from nautobot_version_control.models import (
     Branch,
-    Commit,
     Conflicts,
     ConstraintViolations,
+    MergeCandidate,
+    PullRequest,
 )
+from nautobot_version_control.pagination import PagedTableData
 from nautobot_version_control.tables import (
     ConflictsTable,
     ConstraintViolationsTable,
 )
-from nautobot_version_control.utils import author_from_user, query_on_branch
+from nautobot_version_control.utils import (
+    author_from_user,
+    db_for_branch,
+    get_app_setting,
+    table_columns,
+)
 
 # TODO: this file should be named "conflicts.py"
 
+logger = logging.getLogger(__name__)
+
+# A pending merge candidate build is retried after this many seconds, e.g. if no Celery worker picked it up.
+MERGE_CANDIDATE_BUILD_TIMEOUT = 60 * 10
+# Merge candidates are scheduled at most once per this many seconds when the head of a branch moves.
+MERGE_CANDIDATE_SCHEDULE_INTERVAL = 30
+
+_executor = None
+_executor_lock = threading.Lock()
 
-def get_conflicts_count_for_merge(src, dest):
+
+def get_conflicts_count_for_merge(src, dest, build=True):
     """
     Gather a merge-candidate for `src` and `dest`, then return Conflicts created by the merge.
 
+    If `build` is False and there is no fresh merge candidate, `None` is returned and the
+    merge candidate is built in the background, see `schedule_merge_candidate()`.
+
     TODO: currently we return conflicts summary,
         we need granular row-level conflicts and
         constraint violations.
     """
     try:
-        merge_candidate = get_or_make_merge_candidate(src, dest)
-        with query_on_branch(merge_candidate):
-            _conflicts = Conflicts.objects.all().aggregate(Sum("num_conflicts"))
-            violations = ConstraintViolations.objects.all().aggregate(Sum("num_violations"))
-            num_conflicts = _conflicts["num_conflicts__sum"] if _conflicts["num_conflicts__sum"] else 0
-            num_violations = violations["num_violations__sum"] if violations["num_violations__sum"] else 0
-            return num_conflicts + num_violations
+        merge_candidate = _merge_candidate_for(src, dest, build)
+        if merge_candidate is None:
+            return None
+        # the counts are recorded when the merge candidate is built
+        return merge_candidate.num_conflicts_and_violations
     except Exception:  # pylint: disable=broad-except
         # best effort
         # TODO: fix dolt merge bug
         return 0
 
 
-def get_conflicts_for_merge(src, dest):
+def get_conflicts_for_merge(src, dest, build=True):
     """
     Gather a merge-candidate for `src` and `dest`, then return Conflicts created by the merge.
 
+    If `build` is False and there is no fresh merge candidate, `None` is returned and the
+    merge candidate is built in the background, see `schedule_merge_candidate()`.
+
     TODO: currently we return conflicts summary,
         we need granular row-level conflicts and
         constraint violations.
     """
     try:
-        merge_candidate = get_or_make_merge_candidate(src, dest)
-        with query_on_branch(merge_candidate):
-            conflicts = MergeConflicts(src, dest)
-            return {
-                "summary": conflicts.make_conflict_summary_table(),
-                "conflicts": conflicts.make_conflict_table(),
-                "violations": conflicts.make_constraint_violations_table(),
-            }
+        merge_candidate = _merge_candidate_for(src, dest, build)
+        if merge_candidate is None:
+            return None
+        # the tables read their rows from the merge candidate branch one page at a time
+        conflicts = MergeConflicts(src, dest, using=db_for_branch(merge_candidate.branch))
+        summary = merge_candidate.conflict_summary
+        return {
+            "summary": summary,
+            "conflicts": conflicts.make_conflict_table(summary),
+            "violations": conflicts.make_constraint_violations_table(summary),
+        }
 
     except Exception:  # pylint: disable=broad-except
         # best effort
@@ -68,53 +98,174 @@ def get_conflicts_for_merge(src, dest):
         return {}
 
 
-def merge_candidate_exists(src, dest):
-    """Returns true if there exist a merge_candidate branch between src and dest."""
-    name = _merge_candidate_name(src, dest)
+def _merge_candidate_for(src, dest, build):
+    """Returns the merge candidate for `src` and `dest`, building it inline if `build` is True or in the background otherwise."""
+    if build:
+        return get_or_make_merge_candidate(src, dest)
+    merge_candidate = get_merge_candidate(src, dest)
+    if merge_candidate is None:
+        schedule_merge_candidate(src, dest)
+    return merge_candidate
+
+
+def schedule_merge_candidate(src, dest):
+    """
+    Builds the merge candidate for `src` and `dest` in the background.
+
+    The build runs as a Celery task, in a local worker thread, or inline, as configured by the
+    `merge_candidate_builder` setting. Only one build is scheduled per pair of branch heads.
+    """
+    key = _merge_candidate_build_key(src.hash, dest.hash)
+    if not cache.add(key, True, timeout=MERGE_CANDIDATE_BUILD_TIMEOUT):
+        # a build for these heads is already pending
+        return
+    builder = get_app_setting("merge_candidate_builder")
+    if builder == "celery":
+        # tasks.py imports this module
+        from nautobot_version_control.tasks import (  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+            build_merge_candidate_task,
+        )
+
+        try:
+            build_merge_candidate_task.delay(src.name, dest.name, key)
+        except Exception:  # pylint: disable=broad-except
+            # best effort, e.g. the broker is unavailable: the build is retried on the next page load
+            logger.exception("failed to schedule merge candidate for %s into %s", src, dest)
+            cache.delete(key)
+    elif builder == "thread":
+        _merge_candidate_executor().submit(_build_merge_candidate_in_thread, src.name, dest.name, key)
+    else:
+        build_merge_candidate(src.name, dest.name, key)
+
+
+def schedule_merge_candidates(sender, branch, **kwargs):  # pylint: disable=W0613
+    """
+    Schedules merge candidate builds for the open pull requests from or into `branch`, connected to `branch_head_moved`.
+
+    Builds are only scheduled in the background, at most once every `MERGE_CANDIDATE_SCHEDULE_INTERVAL`
+    seconds per branch. Merge candidates that were not built ahead of time are scheduled when their pull
+    request is viewed, see `get_conflicts_for_merge()`.
+    """
+    if get_app_setting("merge_candidate_builder") not in ("celery", "thread"):
+        return
+    if not cache.add(
+        f"nautobot_version_control.merge_candidate.schedule.{branch}", True, MERGE_CANDIDATE_SCHEDULE_INTERVAL
+    ):
+        return
+    pull_requests = PullRequest.objects.filter(state=PullRequest.OPEN).filter(
+        Q(source_branch=branch) | Q(destination_branch=branch)
+    )
+    if not pull_requests:
+        return
+    branches = Branch.objects.in_bulk(field_name="name")
+    for pull_request in pull_requests:
+        src = branches.get(pull_request.source_branch)
+        dest = branches.get(pull_request.destination_branch)
+        if src and dest:
+            schedule_merge_candidate(src, dest)
+
+
+def build_merge_candidate(src_name, dest_name, key=None):
+    """
+    Builds the merge candidate for the branches named `src_name` and `dest_name`, unless a fresh one exists.
+
+    The pending build marker `key` set by `schedule_merge_candidate()` is cleared afterwards.
+    """
     try:
-        merge_candidate = Branch.objects.get(name=name)
-        return merge_candidate_is_fresh(merge_candidate, src, dest)
-    except Branch.DoesNotExist:
-        return False
+        src = Branch.objects.get(name=src_name)
+        dest = Branch.objects.get(name=dest_name)
+        get_or_make_merge_candidate(src, dest)
+    finally:
+        if key:
+            cache.delete(key)
+
+
+def _build_merge_candidate_in_thread(src_name, dest_name, key):
+    try:
+        build_merge_candidate(src_name, dest_name, key)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("failed to build merge candidate for %s into %s", src_name, dest_name)
+    finally:
+        # connections are thread-local, close the ones opened by the build
+        connections.close_all()
+
+
+def _merge_candidate_executor():
+    """Returns the worker thread used by the "thread" merge candidate builder."""
+    global _executor  # pylint: disable=global-statement  # noqa: PLW0603
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dolt-merge-candidate")
+    return _executor
+
+
+def _merge_candidate_build_key(src_hash, dest_hash):
+    return f"nautobot_version_control.merge_candidate.build.{src_hash}.{dest_hash}"
+
+
+def merge_candidate_exists(src, dest):
+    """Returns true if there exist a fresh merge_candidate branch between src and dest."""
+    return get_merge_candidate(src, dest) is not None
 
 
 def merge_candidate_is_fresh(merge_candidate, src, dest):
     """A merge candidate (MC) is considered "fresh" if the source and destination branches used to create the MC are unchanged since the MC was created."""
     if not merge_candidate:
         return False
-    src_stable = Commit.merge_base(merge_candidate, src) == src.hash
-    dest_stable = Commit.merge_base(merge_candidate, dest) == dest.hash
-    return src_stable and dest_stable
+    return merge_candidate.is_fresh(src, dest)
 
 
 def get_merge_candidate(src, dest):
-    """Returns a merge candidate branch if it exists."""
-    if merge_candidate_exists(src, dest):
-        name = _merge_candidate_name(src, dest)
-        return Branch.objects.get(name=name)
+    """Returns the MergeCandidate between src and dest, if a fresh one exists."""
+    name = _merge_candidate_name(src, dest)
+    merge_candidate = MergeCandidate.objects.filter(branch=name).first()
+    if merge_candidate_is_fresh(merge_candidate, src, dest):
+        return merge_candidate
     return None
 
 
 def make_merge_candidate(src, dest):
-    """Create a merge candidate branch between src and dest."""
+    """
+    Create a merge candidate branch between src and dest.
+
+    The branch heads it was built from and the conflicts of the merge are recorded in a MergeCandidate.
+    The merge runs on a connection to the merge candidate branch, the default connection is left as is.
+    """
     name = _merge_candidate_name(src, dest)
     # force updates the merge-candidate branch
-    Branch(name=name, starting_branch=dest).save()
-    with connection.cursor() as cursor:
+    procedures.call("dolt_branch", "--force", name, dest.hash)
+    using = db_for_branch(name)
+    with connections[using].cursor() as cursor:
         cursor.execute("SET @@dolt_force_transaction_commit = 1;")
-        cursor.execute("""CALL dolt_checkout(%s);""", [name])
-        cursor.execute("""CALL dolt_merge(%s);""", [src])
-        cursor.execute("""CALL dolt_add("-A");""")
-        msg = f"""creating merge candidate with src: "{src}" and dest: "{dest}"."""
-        cursor.execute(  # TODO: not safe
-            f"""CALL dolt_commit(
-                    '--force',
-                    '--all',
-                    '--allow-empty',
-                    '--message', '{msg}',
-                    '--author', '{author_from_user(None)}');"""
-        )
-    return Branch.objects.get(name=name)
+    # merge the exact head the merge candidate is recorded with
+    procedures.call("dolt_merge", src.hash, using=using)
+    procedures.call("dolt_add", "-A", using=using)
+    msg = f"""creating merge candidate with src: "{src}" and dest: "{dest}"."""
+    procedures.call(
+        "dolt_commit",
+        "--force",
+        "--all",
+        "--allow-empty",
+        "--message",
+        msg,
+        "--author",
+        author_from_user(None),
+        using=using,
+    )
+    summary = MergeConflicts(src, dest, using=using).make_conflict_summary_table()
+    merge_candidate, _ = MergeCandidate.objects.update_or_create(
+        branch=name,
+        defaults={
+            "source_branch": src.name,
+            "destination_branch": dest.name,
+            "source_hash": src.hash,
+            "destination_hash": dest.hash,
+            "num_conflicts": sum(tbl["num_conflicts"] for tbl in summary),
+            "num_violations": sum(tbl["num_violations"] for tbl in summary),
+            "conflict_summary": summary,
+        },
+    )
+    return merge_candidate
 
 
 def get_or_make_merge_candidate(src, dest):
@@ -125,74 +276,97 @@ def get_or_make_merge_candidate(src, dest):
     return merge_candidate
 
 
+@lru_cache(maxsize=None)
+def table_model_map():
+    """Returns a dict mapping database table names to their models, built once per process."""
+    return {model._meta.db_table: model for model in apps.get_models()}
+
+
 def _merge_candidate_name(src, dest):
     """Returns the formatted name of a merge candidate branch."""
-    return f"xxx-merge-candidate--{src}--{dest}"
+    return MergeCandidate.name_for(src, dest)
 
 
 class MergeConflicts:
-    """Must run under the mc branch."""
+    """MergeConflicts reads the conflicts of the mc branch through the database alias `using`, see `utils.db_for_branch()`."""
 
-    def __init__(self, src, dest):
+    def __init__(self, src, dest, using="default"):
         """Inits the class vars."""
         self.src = src
         self.dest = dest
-        self.model_map = self._model_map()
-
-    @staticmethod
-    def _model_map():
-        return {ct.model_class()._meta.db_table: ct.model_class() for ct in ContentType.objects.all()}
+        self.using = using
+        self.model_map = table_model_map()
 
     def make_conflict_summary_table(self):
         """Creates the conflict summary table for merge conflicts."""
-        conflicts = Conflicts.objects.all()
-        violations = ConstraintViolations.objects.all()
-        summary = {
-            c.table: {
-                "model": self._model_from_table(c.table),
-                "num_conflicts": c.num_conflicts,
-            }
-            for c in conflicts
-        }
+        conflicts = Conflicts.objects.using(self.using)
+        violations = ConstraintViolations.objects.using(self.using)
+        summary = {}
+        for c in conflicts:
+            summary[c.table] = self._summary_row(c.table)
+            summary[c.table]["num_conflicts"] = c.num_conflicts
         for val in violations:
             if val.table not in summary:
-                summary[val.table] = {"model": self._model_from_table(val.table)}
+                summary[val.table] = self._summary_row(val.table)
             summary[val.table]["num_violations"] = val.num_violations
         return list(summary.values())
 
-    def make_conflict_table(self):
-        """Create a table that represents conflicts on a table between src and dest."""
-        rows = []
-        for conflict in Conflicts.objects.all():
-            rows.extend(self.get_rows_level_conflicts(conflict))
-        return ConflictsTable(rows)
-
-    def make_constraint_violations_table(self):
-        """Creates a table to store constraint violations between two tables."""
-        rows = []
-        for val in ConstraintViolations.objects.all():
-            rows.extend(self.get_rows_level_violations(val))
-        return ConstraintViolationsTable(rows)
+    def _summary_row(self, tbl_name):
+        # rows are JSON-serializable to be stored on the MergeCandidate
+        return {
+            "table": tbl_name,
+            "model": str(self._model_from_table(tbl_name)),
+            "num_conflicts": 0,
+            "num_violations": 0,
+        }
 
-    def get_rows_level_conflicts(self, conflict):
-        """Returns each conflict row in a table as a JSON object."""
-        with connection.cursor() as cursor:
+    def make_conflict_table(self, summary=None):
+        """
+        Create a table that represents conflicts on a table between src and dest.
+
+        Rows are read one page at a time, the number of rows is taken from `summary`.
+        """
+        if summary is None:
+            summary = self.make_conflict_summary_table()
+        counts = [(tbl["table"], tbl["num_conflicts"]) for tbl in summary if tbl["num_conflicts"]]
+        data = ConflictRowsData(counts, self.get_rows_level_conflicts)
+        return ConflictsTable(data, orderable=False, prefix="conflicts_")
+
+    def make_constraint_violations_table(self, summary=None):
+        """
+        Creates a table to store constraint violations between two tables.
+
+        Rows are read one page at a time, the number of rows is taken from `summary`.
+        """
+        if summary is None:
+            summary = self.make_conflict_summary_table()
+        counts = [(tbl["table"], tbl["num_violations"]) for tbl in summary if tbl["num_violations"]]
+        data = ConflictRowsData(counts, self.get_rows_level_violations)
+        return ConstraintViolationsTable(data, orderable=False, prefix="violations_")
+
+    def get_rows_level_conflicts(self, table, offset=None, limit=None):
+        """Returns each conflict row in a table as a JSON object, or `limit` rows starting at `offset`."""
+        with connections[self.using].cursor() as cursor:
             # introspect table schema to query conflict data as json
-            cursor.execute(f"DESCRIBE dolt_conflicts_{conflict.table}")  # TODO: not safe
-            fields = ",".join([f"'{tup[0]}', {tup[0]}" for tup in cursor.fetchall()])
+            columns = table_columns(f"dolt_conflicts_{table}", using=self.using)
+            fields = ",".join([f"'{col}', {col}" for col in columns])
 
             cursor.execute(  # TODO: not safe
                 f"""SELECT base_id, JSON_OBJECT({fields})
-                    FROM dolt_conflicts_{conflict.table};"""  # nosec  # noqa: S608
+                    FROM dolt_conflicts_{table}
+                    ORDER BY COALESCE(base_id, our_id, their_id)
+                    {_limit_clause(offset, limit)};"""  # nosec  # noqa: S608
             )
-            model_name = self._model_from_table(conflict.table)
+            model_name = self._model_from_table(table)
+            conflict_rows = cursor.fetchall()
+            names = self._object_names_from_ids(table, [tup[0] for tup in conflict_rows])
             return [
                 {
                     "model": model_name,
-                    "id": self._object_name_from_id(conflict.table, tup[0]),
+                    "id": names.get(tup[0], tup[0]),
                     "conflicts": self._transform_conflicts_obj(tup[1]),
                 }
-                for tup in cursor.fetchall()
+                for tup in conflict_rows
             ]
 
     def _transform_conflicts_obj(self, obj):
@@ -217,17 +391,21 @@ class MergeConflicts:
                 }
         return obj2
 
-    def get_rows_level_violations(self, violation):
-        """Returns each constrain violation in a JSON row."""
-        with connection.cursor() as cursor:
+    def get_rows_level_violations(self, table, offset=None, limit=None):
+        """Returns each constrain violation in a JSON row, or `limit` rows starting at `offset`."""
+        with connections[self.using].cursor() as cursor:
             rows = []
-            model_name = self._model_from_table(violation.table)
+            model_name = self._model_from_table(table)
             cursor.execute(  # TODO: not safe
                 f"""SELECT id, violation_type, violation_info
-                FROM dolt_constraint_violations_{violation.table};"""  # nosec # noqa: S608
+                FROM dolt_constraint_violations_{table}
+                ORDER BY id, violation_type
+                {_limit_clause(offset, limit)};"""  # nosec # noqa: S608
             )
-            for v_row in cursor.fetchall():
-                obj_name = self._object_name_from_id(violation.table, v_row[0])
+            violation_rows = cursor.fetchall()
+            names = self._object_names_from_ids(table, [v_row[0] for v_row in violation_rows])
+            for v_row in violation_rows:
+                obj_name = names.get(v_row[0], v_row[0])
                 rows.append(
                     {
                         "model": model_name,
@@ -242,13 +420,21 @@ class MergeConflicts:
         model = self.model_map[tbl_name]
         return model._meta.verbose_name
 
-    def _object_name_from_id(self, tbl_name, id_):
-        try:
-            model = self.model_map[tbl_name]
-            obj = model.objects.get(id=id_)
-            return str(obj)
-        except ObjectDoesNotExist:
-            return id_
+    def _object_names_from_ids(self, tbl_name, ids):
+        """Returns a dict mapping each of `ids` that exists in `tbl_name` to the name of its object, in one query."""
+        model = self.model_map[tbl_name]
+        pk_field = model._meta.pk
+        pks = {}
+        for id_ in ids:
+            if id_ is None:
+                continue
+            try:
+                pks[pk_field.to_python(id_)] = id_
+            except ValidationError:
+                continue
+        if not pks:
+            return {}
+        return {pks[pk]: str(obj) for pk, obj in model.objects.using(self.using).in_bulk(list(pks)).items()}
 
     def _fmt_violation(self, v_row, model_name, obj_name):
         v_type = v_row[1]
@@ -271,3 +457,50 @@ class MergeConflicts:
                     columns {v_info["Columns"]}
                 """
         return "Unknown constraint violation"
+
+
+class ConflictRowsData(PagedTableData):
+    """
+    ConflictRowsData reads conflict or constraint violation rows one page at a time.
+
+    `counts` is a list of (table, number of rows) pairs, rows are read table after table with
+    `read_rows(table, offset, limit)`. Rows are read while the page is rendered, if reading fails
+    the error is logged and the table shows no rows.
+    """
+
+    def __init__(self, counts, read_rows):
+        """The init method for ConflictRowsData."""
+        super().__init__()
+        self.counts = counts
+        self.read_rows = read_rows
+
+    def __len__(self):
+        """Returns the number of rows, across all tables."""
+        return sum(count for _, count in self.counts)
+
+    def _rows(self, offset, limit):
+        try:
+            return self._read(offset, limit)
+        except Exception:  # pylint: disable=broad-except
+            # best effort, e.g. the merge candidate branch was deleted since its summary was read
+            logger.exception("failed to read conflict rows")
+            self.counts = []
+            return []
+
+    def _read(self, offset, limit):
+        rows = []
+        for table, count in self.counts:
+            if offset >= count:
+                offset -= count
+                continue
+            rows.extend(self.read_rows(table, offset, min(limit - len(rows), count - offset)))
+            offset = 0
+            if len(rows) >= limit:
+                break
+        return rows
+
+
+def _limit_clause(offset, limit):
+    if limit is None:
+        return ""
+    return f"LIMIT {int(limit)} OFFSET {int(offset or 0)}"
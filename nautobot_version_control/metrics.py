@@ -0,0 +1,40 @@
+"""Prometheus metrics for the Nautobot Version Control app."""
+
+from prometheus_client.metrics_core import GaugeMetricFamily, SummaryMetricFamily
+
+from nautobot_version_control.procedures import procedure_call_stats
+from nautobot_version_control.utils import revision_database_stats
+
+
+def metric_revision_databases():
+    """Yields the number of registered revision database aliases and of open revision database connections."""
+    aliases, open_connections = revision_database_stats()
+
+    gauge = GaugeMetricFamily(
+        "nautobot_version_control_revision_databases",
+        "Number of database aliases registered for Dolt commit revisions",
+    )
+    gauge.add_metric([], aliases)
+    yield gauge
+
+    gauge = GaugeMetricFamily(
+        "nautobot_version_control_revision_connections",
+        "Number of open connections to Dolt commit revision databases",
+    )
+    gauge.add_metric([], open_connections)
+    yield gauge
+
+
+def metric_procedure_calls():
+    """Yields the number of calls and their total duration for each Dolt procedure called by this process."""
+    summary = SummaryMetricFamily(
+        "nautobot_version_control_procedure_calls",
+        "Calls of Dolt stored procedures and functions, and their duration in seconds",
+        labels=["procedure"],
+    )
+    for procedure, (count, duration) in sorted(procedure_call_stats().items()):
+        summary.add_metric([procedure], count_value=count, sum_value=duration)
+    yield summary
+
+
+metrics = [metric_revision_databases, metric_procedure_calls]
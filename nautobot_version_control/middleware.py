@@ -1,19 +1,39 @@
 """The middleware add-ons needed for the Version Control plugin to work."""
 
+from contextvars import ContextVar
+
 from django.contrib import messages
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.db import DatabaseError
 from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.utils.html import format_html
 from nautobot.extras.models.change_logging import ObjectChange
 
+from nautobot_version_control import autocommit
 from nautobot_version_control.constants import (
+    AUTO_COMMIT_SAMPLE_SIZE,
     DOLT_BRANCH_KEYWORD,
+    DOLT_COMMIT_KEYWORD,
     DOLT_DEFAULT_BRANCH,
 )
-from nautobot_version_control.models import Branch, Commit
-from nautobot_version_control.utils import DoltError
+from nautobot_version_control.models import Branch, Commit, CommitChange, MergeCandidate
+from nautobot_version_control.utils import (
+    DoltError,
+    active_branch,
+    active_branch_cache,
+    cache_active_branch,
+    checked_out_branch,
+    set_checked_out_branch,
+)
+
+# The AutoDoltCommit collecting the changes of the current request, if any.
+# Context-local, so concurrent requests in threads or async tasks each see their own.
+_auto_dolt_commit = ContextVar("dolt_auto_commit", default=None)
+
+# Changes to these models are not committed: change logs, the changes recorded with each automatic commit,
+# and merge candidates, which are never committed, see `models.commit_working_set()`.
+_IGNORED_MODELS = (ObjectChange, CommitChange, MergeCandidate)
 
 
 def dolt_health_check_intercept_middleware(get_response):
@@ -37,7 +57,9 @@ class DoltBranchMiddleware:
 
     def __call__(self, request):
         """Override __call__."""
-        return self.get_response(request)
+        # `active_branch()` is memoized for the rest of the request
+        with active_branch_cache():
+            return self.get_response(request)
 
     def process_view(self, request, view_func, view_args, view_kwargs):
         """This maintains the dolt branch session cookie and verifies authentication. It then returns the view that needs to be rendered."""
@@ -48,18 +70,36 @@ class DoltBranchMiddleware:
             request.session[DOLT_BRANCH_KEYWORD] = query_string_branch
             return redirect(request.path)
 
-        branch = DoltBranchMiddleware.get_branch(request)
-        try:
-            branch.checkout()
-        except Exception as err:  # pylint: disable=broad-except
-            msg = "could not checkout branch {}: {}"
-            messages.error(request, format_html(msg, branch, err))
+        # Persistent connections remember the branch they are on, so the checkout is only
+        # needed when the requested branch differs from the one already checked out.
+        requested = branch_from_request(request)
+        if requested == checked_out_branch():
+            cache_active_branch(requested)
+        else:
+            branch = DoltBranchMiddleware.get_branch(request)
+            try:
+                branch.checkout()
+            except Exception as err:  # pylint: disable=broad-except
+                msg = "could not checkout branch {}: {}"
+                messages.error(request, format_html(msg, branch, err))
 
         try:
             return view_func(request, *view_args, **view_kwargs)
         except DoltError as err:
             messages.error(request, format_html("{}", err))
             return redirect(request.path)
+        except DatabaseError:
+            # The branch checked out on this connection may have been deleted by another process,
+            # its existence is only looked up once its queries fail.
+            if requested == DOLT_DEFAULT_BRANCH or Branch.objects.filter(pk=requested).exists():
+                raise
+            messages.warning(
+                request,
+                format_html('<div class="text-center">branch not found: {}</div>', requested),
+            )
+            request.session[DOLT_BRANCH_KEYWORD] = DOLT_DEFAULT_BRANCH
+            set_checked_out_branch(None)
+            return redirect(request.path)
 
     @staticmethod
     def get_branch(request):
@@ -106,61 +146,96 @@ class AutoDoltCommit:
         """The init methods for dolt commit."""
         self.request = request
         self.commit = False
+        # per db, the number of changes and a few object names for each (action, model)
         self.changes_for_db = {}
+        # per db, every changed object as an (action, model label, pk) key, see `CommitChange`
+        self.objects_for_db = {}
 
     def __enter__(self):
         """Overwrite methods for dolt commit enter."""
-        # Connect our receivers to the post_save and post_delete signals.
-        post_save.connect(self._handle_update, dispatch_uid="dolt_commit_update")
-        m2m_changed.connect(self._handle_update, dispatch_uid="dolt_commit_update")
-        pre_delete.connect(self._handle_delete, dispatch_uid="dolt_commit_delete")
+        # Route the changes of this context to this instance, see `handle_auto_dolt_commit_update()`.
+        self._token = _auto_dolt_commit.set(self)
 
     def __exit__(self, type, value, traceback):  # pylint: disable=W0622
         """Overwrite methods for dolt commit exit."""
-        if self.commit:
-            self.make_commits()
-
-        # Disconnect change logging signals. This is necessary to avoid recording any errant
-        # changes during test cleanup.
-        post_save.disconnect(self._handle_update, dispatch_uid="dolt_commit_update")
-        m2m_changed.disconnect(self._handle_update, dispatch_uid="dolt_commit_update")
-        pre_delete.disconnect(self._handle_delete, dispatch_uid="dolt_commit_delete")
+        try:
+            if self.commit:
+                self.make_commits()
+            elif self.commit_requested() and autocommit.is_batching():
+                autocommit.flush(active_branch())
+        finally:
+            # Stop collecting changes. This is necessary to avoid recording any errant
+            # changes during test cleanup.
+            _auto_dolt_commit.reset(self._token)
 
     def _handle_update(self, sender, instance, **kwargs):  # pylint: disable=W0613
         """Fires when an object is created or updated."""
-        if isinstance(instance, ObjectChange):
-            # ignore ObjectChange instances
+        if isinstance(instance, _IGNORED_MODELS):
             return
 
-        msg = self.change_msg_for_update(instance, kwargs)
-        self.collect_change(instance, msg)
+        action = CommitChange.CREATED if kwargs.get("created") else CommitChange.UPDATED
+        self.collect_change(instance, action)
         self.commit = True
 
     def _handle_delete(self, sender, instance, **kwargs):  # pylint: disable=W0613
         """Fires when an object is deleted."""
-        if isinstance(instance, ObjectChange):
-            # ignore ObjectChange instances
+        if isinstance(instance, _IGNORED_MODELS):
             return
 
-        msg = self.change_msg_for_delete(instance)
-        self.collect_change(instance, msg)
+        self.collect_change(instance, CommitChange.DELETED)
         self.commit = True
 
     def make_commits(self):
-        """Create and saves a Commit object."""
-        for database, msgs in self.changes_for_db.items():
-            msg = "; ".join(msgs)
-            Commit(message=msg).save(
+        """Create and saves a Commit object, and records the objects it changed."""
+        for database, changes in self.changes_for_db.items():
+            if database == "default" and autocommit.is_batching():
+                # changes to branch data may be committed together with those of other requests
+                autocommit.defer_commit(
+                    active_branch(),
+                    changes,
+                    self.objects_for_db[database],
+                    self.request.user,
+                    force=self.commit_requested(),
+                )
+                continue
+            msg = "; ".join(
+                self.change_msg(action, model, count, names) for (action, model), (count, names) in changes.items()
+            )
+            # the changed objects are recorded in the commit itself
+            CommitChange.objects.using(database).bulk_create(
+                [
+                    CommitChange(action=action, model=label, object_id=pk)
+                    for action, label, pk in self.objects_for_db[database]
+                ],
+                batch_size=1000,
+            )
+            commit = Commit(message=msg)
+            commit.save(
                 user=self.request.user,
                 using=database,
             )
 
-    def collect_change(self, instance, msg):
-        """Stores changes messages for each db."""
+    def collect_change(self, instance, action):
+        """Counts the change of `instance` for its db, only the first few object names of each model are kept."""
         database = self.database_from_instance(instance)
-        if database not in self.changes_for_db:
-            self.changes_for_db[database] = []
-        self.changes_for_db[database].append(msg)
+        key = (action, instance._meta.label_lower, str(instance.pk))
+        objects = self.objects_for_db.setdefault(database, {})
+        if key in objects:
+            # e.g. the pre and post signals of an m2m change
+            return
+        objects[key] = None
+
+        count_and_names = self.changes_for_db.setdefault(database, {}).setdefault(
+            (action, instance._meta.model), [0, []]
+        )
+        count_and_names[0] += 1
+        if len(count_and_names[1]) < AUTO_COMMIT_SAMPLE_SIZE:
+            count_and_names[1].append(str(instance))
+
+    def commit_requested(self):
+        """Returns `True` if the request asks for its changes to be committed immediately."""
+        value = self.request.headers.get(DOLT_COMMIT_KEYWORD, "") if self.request is not None else ""
+        return value.lower() in ("1", "true", "yes")
 
     @staticmethod
     def database_from_instance(instance):
@@ -168,16 +243,27 @@ class AutoDoltCommit:
         return instance._state.db  # pylint: disable=W0212
 
     @staticmethod
-    def change_msg_for_update(instance, kwargs):
-        """Generates a commit message for create or update."""
-        created = "created" in kwargs and kwargs["created"]
-        verb = "Created" if created else "Updated"
-        return f"""{verb} {instance._meta.verbose_name} "{instance}" """
-
-    @staticmethod
-    def change_msg_for_delete(instance):
-        """Generates a commit message for delete."""
-        return f"""Deleted {instance._meta.verbose_name} "{instance}" """
+    def change_msg(action, model, count, names):
+        """Generates a commit message for `count` changes of `model` objects, listing `names`."""
+        verbose_name = model._meta.verbose_name if count == 1 else model._meta.verbose_name_plural
+        msg = f"{action.capitalize()} {count} {verbose_name}: {', '.join(names)}"
+        if count > len(names):
+            msg += f" and {count - len(names)} more"
+        return msg
+
+
+def handle_auto_dolt_commit_update(sender, instance, **kwargs):
+    """Fires when an object is created or updated, connected to `post_save` and `m2m_changed` once at startup."""
+    auto_dolt_commit = _auto_dolt_commit.get()
+    if auto_dolt_commit is not None:
+        auto_dolt_commit._handle_update(sender, instance, **kwargs)  # pylint: disable=W0212
+
+
+def handle_auto_dolt_commit_delete(sender, instance, **kwargs):
+    """Fires when an object is deleted, connected to `pre_delete` once at startup."""
+    auto_dolt_commit = _auto_dolt_commit.get()
+    if auto_dolt_commit is not None:
+        auto_dolt_commit._handle_delete(sender, instance, **kwargs)  # pylint: disable=W0212
 
 
 def branch_from_request(request):
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nautobot_version_control", "0008_charfield_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MergeCandidate",
+            fields=[
+                ("branch", models.CharField(max_length=1024, primary_key=True, serialize=False)),
+                ("source_branch", models.CharField(max_length=1024)),
+                ("destination_branch", models.CharField(max_length=1024)),
+                ("source_hash", models.CharField(max_length=32)),
+                ("destination_hash", models.CharField(max_length=32)),
+                ("created", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "nautobot_version_control_mergecandidate",
+            },
+        ),
+    ]
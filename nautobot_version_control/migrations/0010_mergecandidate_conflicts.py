@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def delete_merge_candidates(apps, schema_editor):
+    """Forget merge candidates recorded without their conflicts, they are rebuilt on demand."""
+    MergeCandidate = apps.get_model("nautobot_version_control", "MergeCandidate")  # pylint: disable=invalid-name
+    MergeCandidate.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nautobot_version_control", "0009_mergecandidate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mergecandidate",
+            name="num_conflicts",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="mergecandidate",
+            name="num_violations",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="mergecandidate",
+            name="conflict_summary",
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(delete_merge_candidates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nautobot_version_control", "0010_mergecandidate_conflicts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CommitChange",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("commit_hash", models.CharField(db_index=True, max_length=32)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("created", "Created"), ("updated", "Updated"), ("deleted", "Deleted")],
+                        max_length=10,
+                    ),
+                ),
+                ("model", models.CharField(max_length=255)),
+                ("object_id", models.CharField(max_length=255)),
+            ],
+            options={
+                "db_table": "nautobot_version_control_commitchange",
+            },
+        ),
+    ]
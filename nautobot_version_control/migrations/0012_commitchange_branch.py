@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nautobot_version_control", "0011_commitchange"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="commitchange",
+            name="branch",
+            field=models.CharField(blank=True, default="", max_length=1024),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # recorded changes are now part of the commits they describe, earlier ones were never committed
+    dependencies = [
+        ("nautobot_version_control", "0012_commitchange_branch"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="CommitChange",
+        ),
+        migrations.CreateModel(
+            name="CommitChange",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("created", "Created"), ("updated", "Updated"), ("deleted", "Deleted")],
+                        max_length=10,
+                    ),
+                ),
+                ("model", models.CharField(max_length=255)),
+                ("object_id", models.CharField(max_length=255)),
+            ],
+            options={
+                "db_table": "nautobot_version_control_commitchange",
+            },
+        ),
+    ]
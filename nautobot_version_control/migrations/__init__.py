@@ -1,15 +1,14 @@
-from django.db import connection
+from nautobot_version_control.utils import invalidate_schema_cache
 
 
 def auto_dolt_commit_migration(sender, **kwargs):
+    # table schemas may have changed, so cached introspection results are stale
+    invalidate_schema_cache()
     msg = "Completed database migration"
     author = "system <nautobot@nautobot.invalid>"
-    with connection.cursor() as cursor:
-        cursor.execute("CALL dolt_add('-A');")
-        cursor.execute(
-            f"""
-            CALL dolt_commit(
-                '--all',
-                '--message', '{msg}',
-                '--author', '{author}');"""
-        )
+    # models are only loaded once the app registry is ready
+    from nautobot_version_control.models import (  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+        commit_working_set,
+    )
+
+    commit_working_set(msg, author)
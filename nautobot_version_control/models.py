@@ -1,9 +1,14 @@
 """Dolt primitives such as branches and commits as Django models."""
 
-from django.core.exceptions import ObjectDoesNotExist
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ObjectDoesNotExist
 from django.db import connection, connections, models
-from django.db.models import Q
+from django.db.models import Case, CharField, Count, IntegerField, OuterRef, Q, Subquery, Value, When
 from django.db.models.deletion import CASCADE
+from django.db.models.functions import Coalesce
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
 from django.urls import reverse
@@ -13,8 +18,26 @@ from nautobot.core.models.querysets import RestrictedQuerySet
 from nautobot.extras.utils import extras_features
 from nautobot.users.models import User
 
-from nautobot_version_control.constants import DOLT_DEFAULT_BRANCH
-from nautobot_version_control.utils import DoltError, active_branch, author_from_user, db_for_commit
+from nautobot_version_control import graph, procedures
+from nautobot_version_control.constants import CHANGE_COUNT_RE
+from nautobot_version_control.signals import branch_head_moved
+from nautobot_version_control.utils import (
+    DoltError,
+    active_branch,
+    author_from_user,
+    checked_out_branch,
+    checkout_branch,
+    db_for_commit,
+    set_checked_out_branch,
+)
+
+# The count of a query of the commit log only changes when the head of its database moves.
+COMMIT_COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def format_ahead_behind(ahead, behind):
+    """Returns the display string for ahead/behind counts."""
+    return f"{ahead} ahead / {behind} behind"
 
 
 class DoltSystemTable(models.Model):
@@ -39,9 +62,42 @@ class DoltSystemTable(models.Model):
 #
 
 
+class BranchQuerySet(RestrictedQuerySet):
+    """BranchQuerySet can load the BranchMeta of every branch it returns in one query, see `with_meta()`."""
+
+    _with_meta = False
+
+    def with_meta(self):
+        """Returns a copy of the queryset that attaches the BranchMeta and author of each branch when it is evaluated."""
+        clone = self._chain()
+        clone._with_meta = True
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._with_meta = self._with_meta
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if fetched and self._with_meta:
+            attach_branch_meta(branch for branch in self._result_cache if isinstance(branch, Branch))
+
+
+def attach_branch_meta(branches):
+    """Loads the BranchMeta of each branch in `branches` with a single query, so that their metadata properties do not query."""
+    branches = list(branches)
+    metas = BranchMeta.objects.select_related("author").in_bulk([branch.name for branch in branches])
+    for branch in branches:
+        branch._branch_meta_cache = metas.get(branch.name)  # pylint: disable=protected-access
+
+
 class Branch(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TODO
     """Branch represents a model over the dolt_branches system table."""
 
+    objects = BranchQuerySet.as_manager()
+
     name = models.TextField(primary_key=True)
     hash = models.TextField()
     latest_committer = models.TextField()
@@ -90,14 +146,8 @@ class Branch(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TOD
         branch. Behind represents how many commits are on main that have diverged passed this branch.
         :return: ahead/behind string.
         """
-        merge_base = Commit.merge_base(self.name, DOLT_DEFAULT_BRANCH)
-        merge_base_commit = Commit.objects.using(db_for_commit(self.hash)).get(commit_hash=merge_base)
-        main_hash = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
-
-        ahead = Commit.objects.filter(date__gt=merge_base_commit.date).using(db_for_commit(self.hash)).count()
-        behind = Commit.objects.filter(date__gt=merge_base_commit.date).using(db_for_commit(main_hash)).count()
-
-        return f"{ahead} ahead / {behind} behind"
+        ahead, behind = graph.ahead_behind([self])[self.name]
+        return format_ahead_behind(ahead, behind)
 
     @property
     def created_by(self):
@@ -119,14 +169,16 @@ class Branch(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TOD
 
     def checkout(self):
         """Checkout performs a checkout operation to this branch making it the active_branch."""
-        with connection.cursor() as cursor:
-            cursor.execute(f"""CALL dolt_checkout("{self.name}");""")  # TODO: not safe
+        checkout_branch(self.name)
 
     def _branch_meta(self):
-        try:
-            return BranchMeta.objects.get(branch=self.name)
-        except ObjectDoesNotExist:
-            return None
+        # loaded once per instance, or in bulk by `BranchQuerySet.with_meta()`
+        if not hasattr(self, "_branch_meta_cache"):
+            try:
+                self._branch_meta_cache = BranchMeta.objects.select_related("author").get(branch=self.name)
+            except ObjectDoesNotExist:
+                self._branch_meta_cache = None
+        return self._branch_meta_cache
 
     def head(self):
         """Head returns the most recent commit for this branch as an object."""
@@ -141,62 +193,50 @@ class Branch(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TOD
         :param squash: Whether or not to squash the merge thereby making it one commit
         :return:
         """
+        # autocommit.py imports this module
+        from nautobot_version_control import autocommit  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+
+        # commit the pending changes of both branches, so that the merge includes them under their own messages
+        for branch in (str(merge_branch), self.name):
+            autocommit.flush(branch)
+
         author = author_from_user(user)
         self.checkout()
         with connection.cursor() as cursor:
             cursor.execute("SET dolt_force_transaction_commit = 1;")
-            if squash:
-                cursor.execute(  # TODO: not safe
-                    f"""CALL dolt_merge(
-                        '--squash',
-                        '{merge_branch}'
-                    );"""
-                )
-            else:
-                cursor.execute(  # TODO: not safe
-                    f"""CALL dolt_merge(
-                        '--no-ff',
-                        '{merge_branch}'
-                    );"""
-                )
-            res = cursor.fetchone()
-            # dolt_merge returns a signature that is at the time of this writing:
-            # ws, h.String(), noConflictsOrViolations, fastForwardMerge, str, nil
-            # test the noConflictsOrViolations and fastForwardMerge is good
-            if res[1] == 0 and res[2] == 0:  # magic???
-                # only commit merged data on success
-                msg = f"""merged "{merge_branch}" into "{self.name}"."""
-                cursor.execute(  # TODO: not safe
-                    f"""CALL dolt_commit(
-                        '--all',
-                        '--allow-empty',
-                        '--message', '{msg}',
-                        '--author', '{author}'
-                    );"""
-                )
-            else:
-                cursor.execute("CALL dolt_merge('--abort');")  # nosec
-                raise DoltError(
+        res = procedures.call("dolt_merge", "--squash" if squash else "--no-ff", merge_branch)
+        # dolt_merge returns a signature that is at the time of this writing:
+        # ws, h.String(), noConflictsOrViolations, fastForwardMerge, str, nil
+        # test the noConflictsOrViolations and fastForwardMerge is good
+        if res[1] == 0 and res[2] == 0:  # magic???
+            # only commit merged data on success
+            msg = f"""merged "{merge_branch}" into "{self.name}"."""
+            commit_working_set(msg, author)
+            branch_head_moved.send(sender=self.__class__, branch=self.name)
+        else:
+            procedures.call("dolt_merge", "--abort")
+            raise DoltError(
+                format_html(
+                    "{}",
                     format_html(
-                        "{}",
-                        format_html(
-                            "Merging <strong>{}</strong> into <strong>{}</strong> created merge conflicts. "
-                            "Resolve merge conflicts to reattempt the merge.",
-                            merge_branch,
-                            self,
-                        ),
-                    )
+                        "Merging <strong>{}</strong> into <strong>{}</strong> created merge conflicts. "
+                        "Resolve merge conflicts to reattempt the merge.",
+                        merge_branch,
+                        self,
+                    ),
                 )
+            )
 
     def save(self, *args, **kwargs):
         """Save overrides the model save method."""
-        with connection.cursor() as cursor:
-            cursor.execute(f"""CALL dolt_branch('{self.name}','{self.starting_branch}');""")  # nosec  # TODO: not safe
+        procedures.call("dolt_branch", self.name, self.starting_branch)
 
     def delete(self, *args, **kwargs):
         """Delete overrides the model delete method."""
-        with connection.cursor() as cursor:
-            cursor.execute(f"""CALL dolt_branch('-D','{self.name}');""")  # nosec  # TODO: not safe
+        procedures.call("dolt_branch", "-D", self.name)
+        MergeCandidate.objects.filter(branch=self.name).delete()
+        if checked_out_branch() == self.name:
+            set_checked_out_branch(None)
 
 
 @receiver(pre_delete, sender=Branch)
@@ -244,14 +284,132 @@ class BranchMeta(models.Model):  # pylint: disable=nb-incorrect-base-class  # TO
         db_table = "nautobot_version_control_branchmeta"
 
 
+class MergeCandidate(models.Model):  # pylint: disable=nb-incorrect-base-class  # TODO
+    """
+    MergeCandidate records the branch heads a merge candidate branch was built from, and the conflicts it holds.
+
+    A merge candidate branch holds the result of merging a source branch into a destination branch.
+    It is fresh as long as the heads of both branches are the ones it was built from.
+    Merge candidates are never committed, they stay in the working set of main, see `commit_working_set()`.
+    """
+
+    branch = models.CharField(primary_key=True, max_length=1024)
+    source_branch = models.CharField(max_length=1024)
+    destination_branch = models.CharField(max_length=1024)
+    source_hash = models.CharField(max_length=32)
+    destination_hash = models.CharField(max_length=32)
+    created = models.DateTimeField(auto_now=True)
+    num_conflicts = models.IntegerField(default=0)
+    num_violations = models.IntegerField(default=0)
+    # per-table conflict and violation counts, see `MergeConflicts.make_conflict_summary_table()`
+    conflict_summary = models.JSONField(default=list)
+
+    class Meta:
+        """Meta class."""
+
+        # table name cannot start with "dolt"
+        db_table = "nautobot_version_control_mergecandidate"
+
+    def __str__(self):
+        """Return a simple string if model is called."""
+        return self.branch
+
+    @staticmethod
+    def name_for(src, dest):
+        """Returns the name of the merge candidate branch for merging `src` into `dest`."""
+        return f"xxx-merge-candidate--{src}--{dest}"
+
+    @property
+    def num_conflicts_and_violations(self):
+        """Returns the total number of conflicts and constraint violations of the merge."""
+        return self.num_conflicts + self.num_violations
+
+    def is_fresh(self, src, dest):
+        """Returns whether the heads of the Branches `src` and `dest` are the ones the merge candidate was built from."""
+        return self.source_hash == src.hash and self.destination_hash == dest.hash
+
+    @classmethod
+    def conflict_counts(cls, pull_requests):
+        """
+        Returns the number of conflicts and violations of each pull request in `pull_requests`.
+
+        The merge candidates of all pull requests are read in a single query. Pull requests
+        without a fresh merge candidate map to `None`.
+
+        :return: a dict mapping pull request pks to counts
+        """
+        pull_requests = list(pull_requests)
+        names = {pr.pk: cls.name_for(pr.source_branch, pr.destination_branch) for pr in pull_requests}
+        candidates = cls.objects.in_bulk(list(set(names.values())))
+        heads = dict(Branch.objects.values_list("name", "hash"))
+
+        counts = {}
+        for pr in pull_requests:
+            candidate = candidates.get(names[pr.pk])
+            fresh = (
+                candidate is not None
+                and candidate.source_hash == heads.get(pr.source_branch)
+                and candidate.destination_hash == heads.get(pr.destination_branch)
+            )
+            counts[pr.pk] = candidate.num_conflicts_and_violations if fresh else None
+        return counts
+
+
 #
 # Commits
 #
 
 
+class CommitQuerySet(RestrictedQuerySet):
+    """
+    CommitQuerySet caches the counts of queries of the commit log.
+
+    Counting `dolt_log` walks the whole history, so counts are cached on the head commit of the
+    database and the SQL of the query, which together determine the result.
+    """
+
+    def count(self):
+        """Returns the number of commits of the query, from the cache if the head of the database has not moved."""
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        try:
+            sql = str(self.query)
+        except EmptyResultSet:
+            # e.g. `commit_hash__in` an empty set
+            return 0
+        head = procedures.function("hashof", "HEAD", using=self.db)
+        key = f"nautobot_version_control.commit_count.{head}.{hashlib.sha256(sql.encode()).hexdigest()}"
+        count = cache.get(key)
+        if count is None:
+            count = super().count()
+            cache.set(key, count, timeout=COMMIT_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+def commit_working_set(message, author, using="default"):
+    """
+    Commits every change in the working set of `using` and returns the hash of the new commit.
+
+    Merge candidates are left out on purpose: they are a cache of the app kept in the working set of
+    main, see `MergeCandidate`, and would otherwise be folded into unrelated commits.
+    """
+    procedures.call("dolt_add", "-A", using=using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT status FROM dolt_status WHERE table_name = %s AND staged;", [MergeCandidate._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is not None and row[0] != "new table":
+        # a new table, e.g. created by a migration, is committed as usual
+        procedures.call("dolt_reset", MergeCandidate._meta.db_table, using=using)
+    return procedures.call("dolt_commit", "--allow-empty", "--message", message, "--author", author, using=using)[0]
+
+
 class Commit(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TODO
     """Commit represents a Dolt Commit primitive."""
 
+    objects = CommitQuerySet.as_manager()
+
     commit_hash = models.TextField(primary_key=True)
     committer = models.TextField()
     email = models.TextField()
@@ -275,27 +433,44 @@ class Commit(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TOD
 
     @staticmethod
     def merge_base(left, right):
-        """Returns the ancestor commit between two commits."""
-        with connection.cursor() as conn:
-            # author credentials not set
-            conn.execute(f"SELECT dolt_merge_base('{left}', '{right}');")
-            return conn.fetchone()[0]
+        """Returns the ancestor commit between two commits, each either a commit hash or a branch name."""
+        return graph.merge_base(left, right)
 
     @staticmethod
     def revert(commits, user):
         """Revert executes a revert command on a commit which undoes it from the commit log."""
-        args = ", ".join([f"'{commit}'" for commit in commits])
         author = author_from_user(user)
-        args += f", '--author', '{author}'"
-        with connection.cursor() as conn:
-            conn.execute(f"CALL dolt_revert({args});")
-            return conn.fetchone()[0]
+        res = procedures.call("dolt_revert", *commits, "--author", author)[0]
+        branch_head_moved.send(sender=Commit, branch=active_branch())
+        return res
 
     @property
     def short_message(self):
         """Truncates a commit message."""
         split = self.message.split(";")
-        return split[0] + f". Total number of changes: {len(split)}"
+        # automatic commit messages aggregate changes, e.g. "Created 3 devices: d1, d2, d3"
+        total = sum(int(m.group(1)) if (m := CHANGE_COUNT_RE.match(part)) else 1 for part in split)
+        return split[0] + f". Total number of changes: {total}"
+
+    @property
+    def changes(self):
+        """Returns the objects changed by this commit, as recorded by automatic commits in the commit itself."""
+        using = db_for_commit(self.commit_hash)
+        parent = (
+            CommitAncestor.objects.using(using)
+            .filter(commit_hash=self.commit_hash, parent_index=0)
+            .values_list("parent_hash", flat=True)
+            .first()
+        )
+        if not parent:
+            return CommitChange.objects.using(using).none()
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT to_id FROM dolt_diff(%s, %s, %s) WHERE diff_type = 'added'",
+                [parent, self.commit_hash, CommitChange._meta.db_table],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        return CommitChange.objects.using(using).filter(pk__in=ids)
 
     @property
     def present_in_database(self):
@@ -308,20 +483,17 @@ class Commit(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TOD
         """Returns the hashes of the commit ancestor."""
         return CommitAncestor.objects.filter(commit_hash=self.commit_hash).values_list("parent_hash", flat=True)
 
-    def save(self, *args, using="default", user=None, **kwargs):  # pylint: disable=W0221
-        """Overrides the Django model save behavior and perform a commit on the database."""
-        msg = self.message.replace('"', "")
-        author = author_from_user(user)
-        conn = connections[using]
-        with conn.cursor() as cursor:
-            cursor.execute(  # TODO: not safe
-                f"""
-            CALL dolt_commit(
-                '--all',
-                '--allow-empty',
-                '--message', "{msg}",
-                '--author', "{author}")"""
-            )
+    def save(self, *args, using="default", user=None, author=None, **kwargs):  # pylint: disable=W0221
+        """Overrides the Django model save behavior and perform a commit on the database.
+
+        The commit is authored by `user`, or by the `author` string if given. The hash of the
+        new commit is stored in `commit_hash`.
+        """
+        author = author or author_from_user(user)
+        self.commit_hash = commit_working_set(self.message, author, using=using)
+        if using == "default":
+            # commits to the global state database do not move a branch of a pull request
+            branch_head_moved.send(sender=self.__class__, branch=active_branch())
 
 
 class CommitAncestor(DoltSystemTable):  # pylint: disable=nb-incorrect-base-class  # TODO
@@ -348,6 +520,43 @@ class CommitAncestor(DoltSystemTable):  # pylint: disable=nb-incorrect-base-clas
         return
 
 
+class CommitChange(models.Model):  # pylint: disable=nb-incorrect-base-class  # TODO
+    """
+    CommitChange records an object changed by an automatic commit, see `middleware.AutoDoltCommit`.
+
+    Commit messages only list a few changed objects per model, the complete list is kept here.
+    Changes are versioned: they are written to the working set of the branch before the commit they
+    describe, so they are part of that commit, see `Commit.changes`. Writes must name the database
+    of the branch with `using()`, the router sends writes of this app's models to main.
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTION_CHOICES = [
+        (CREATED, "Created"),
+        (UPDATED, "Updated"),
+        (DELETED, "Deleted"),
+    ]
+
+    # UUIDs, so that rows recorded on different branches never conflict when merged
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # the model label, e.g. "dcim.device"
+    model = models.CharField(max_length=255)
+    object_id = models.CharField(max_length=255)
+
+    class Meta:
+        """Meta class."""
+
+        # table name cannot start with "dolt"
+        db_table = "nautobot_version_control_commitchange"
+
+    def __str__(self):
+        """Return a simple string if model is called."""
+        return f"{self.get_action_display()} {self.model} {self.object_id}"
+
+
 #
 # Conflicts
 #
@@ -394,6 +603,38 @@ class ConstraintViolations(DoltSystemTable):  # pylint: disable=nb-incorrect-bas
 #
 
 
+class PullRequestQuerySet(RestrictedQuerySet):
+    """PullRequestQuerySet computes the status and number of reviews of pull requests in the database, see `with_status()`."""
+
+    def with_status(self):
+        """
+        Annotates each pull request with its `computed_status` and `review_count`.
+
+        The status is computed as in `PullRequest.status`, from the state of the pull request and its
+        latest approving or blocking review, so it can be filtered and sorted on in the database.
+        """
+        if "computed_status" in self.query.annotations:
+            return self
+        reviews = PullRequestReview.objects.filter(pull_request=OuterRef("pk")).order_by()
+        review_count = reviews.values("pull_request").annotate(count=Count("pk")).values("count")[:1]
+        decisive = reviews.filter(state__in=[PullRequestReview.APPROVED, PullRequestReview.BLOCKED])
+        decision = decisive.order_by("-reviewed_at").values("state")[:1]
+        return self.annotate(
+            review_count=Coalesce(Subquery(review_count, output_field=IntegerField()), 0),
+            latest_decision=Subquery(decision, output_field=IntegerField()),
+        ).annotate(
+            computed_status=Case(
+                When(state=PullRequest.CLOSED, then=Value("closed")),
+                When(state=PullRequest.MERGED, then=Value("merged")),
+                When(review_count=0, then=Value("open")),
+                When(latest_decision=PullRequestReview.APPROVED, then=Value("approved")),
+                When(latest_decision=PullRequestReview.BLOCKED, then=Value("blocked")),
+                default=Value("in-review"),
+                output_field=CharField(),
+            ),
+        )
+
+
 @extras_features(
     "webhooks",
 )
@@ -408,6 +649,14 @@ class PullRequest(BaseModel):
         (MERGED, "Merged"),
         (CLOSED, "Closed"),
     ]
+    PR_STATUS_CHOICES = [
+        ("open", "Open"),
+        ("in-review", "In Review"),
+        ("approved", "Approved"),
+        ("blocked", "Blocked"),
+        ("merged", "Merged"),
+        ("closed", "Closed"),
+    ]
 
     title = models.CharField(max_length=240)
     state = models.IntegerField(choices=PR_STATE_CHOICES, default=OPEN)
@@ -418,7 +667,7 @@ class PullRequest(BaseModel):
     creator = models.ForeignKey(User, on_delete=CASCADE)
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
 
-    objects = RestrictedQuerySet.as_manager()
+    objects = PullRequestQuerySet.as_manager()
 
     class Meta:
         """Meta information for PullRequest model."""
@@ -453,7 +702,10 @@ class PullRequest(BaseModel):
 
         PRs in a closed or merged state have the corresponding status.
         An open PR's state is determined by the last non-comment review.
+        Pull requests loaded with `PullRequestQuerySet.with_status()` have their status computed already.
         """
+        if hasattr(self, "computed_status"):
+            return self.computed_status
         if self.state == PullRequest.CLOSED:
             return "closed"
         if self.state == PullRequest.MERGED:
@@ -464,8 +716,12 @@ class PullRequest(BaseModel):
             return "open"
 
         # get the most recent review that approved or blocked
-        decision = pr_reviews.order_by("-reviewed_at").first()
-        if not decision or (decision and decision.state == PullRequestReview.COMMENTED):
+        decision = (
+            pr_reviews.filter(state__in=[PullRequestReview.APPROVED, PullRequestReview.BLOCKED])
+            .order_by("-reviewed_at")
+            .first()
+        )
+        if not decision:
             # all PRs are "comments"
             return "in-review"
         if decision.state == PullRequestReview.APPROVED:
@@ -476,10 +732,12 @@ class PullRequest(BaseModel):
 
     @property
     def commits(self):
-        """Returns a queryset of Commit objects that come after the ancestor between the src and des branch."""
-        merge_base = Commit.objects.get(commit_hash=Commit.merge_base(self.source_branch, self.destination_branch))
-        database = db_for_commit(Branch.objects.get(name=self.source_branch).hash)
-        return Commit.objects.filter(date__gt=merge_base.date).using(database)
+        """Returns a queryset of Commit objects on the src branch that are not on the dest branch."""
+        source_hash = Branch.objects.get(name=self.source_branch).hash
+        hashes = graph.commits_ahead(source_hash, self.destination_branch)
+        if not hashes:
+            return Commit.objects.none()
+        return Commit.objects.filter(commit_hash__in=hashes).using(db_for_commit(source_hash))
 
     @property
     def num_commits(self):
@@ -489,6 +747,8 @@ class PullRequest(BaseModel):
     @property
     def num_reviews(self):
         """Returns the number of PullRRequestReview(s) created on top of the PR."""
+        if hasattr(self, "review_count"):
+            return self.review_count
         return PullRequestReview.objects.filter(pull_request=self.pk).count()
 
     @property
@@ -497,7 +757,7 @@ class PullRequest(BaseModel):
         return f"""Merging {self.num_commits} commits from "{self.source_branch}" into "{self.destination_branch}" """
 
     def merge(self, user=None, squash=False):
-        """Execute a merge between a destination and src branch."""
+        """Execute a merge between a destination and src branch, see `Branch.merge()`."""
         try:
             src = Branch.objects.get(name=self.source_branch)
             dest = Branch.objects.get(name=self.destination_branch)
@@ -0,0 +1,240 @@
+"""Pagination.py pages over the Dolt commit log with a keyset on (date, commit_hash) rather than offsets.
+
+A page is fetched by filtering on the position of the last (or first) commit of the previous page, so
+deep pages cost as much as the first one. The position is passed around as an opaque cursor, which
+also records the offset of the page, for display only.
+
+Tables over Dolt system tables, e.g. diffs and merge conflicts, read their rows one page at a time
+with `PagedTableData`.
+"""
+
+import base64
+import json
+import math
+
+from django.core.paginator import EmptyPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django_tables2.data import TableData
+from django_tables2.rows import BoundRows
+from nautobot.core.api.pagination import OptionalLimitOffsetPagination
+from nautobot.core.views.paginator import EnhancedPaginator
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Cursor directions: the commits older or newer than the commit of the cursor.
+OLDER = "o"
+NEWER = "n"
+
+
+def encode_cursor(offset, direction, commit):
+    """Returns the cursor for the commits before or after `commit`, at `offset` in the log."""
+    position = [offset, direction, commit.date.isoformat(), commit.commit_hash]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns the (offset, direction, date, commit hash) of `cursor`, or `None` if it is invalid."""
+    try:
+        offset, direction, date, commit_hash = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date = parse_datetime(date)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if direction not in (OLDER, NEWER) or date is None:
+        return None
+    return int(offset), direction, date, commit_hash
+
+
+class CommitKeyset:
+    """CommitKeyset fetches the page of commits at `cursor`, newest first."""
+
+    def __init__(self, queryset, cursor, per_page):
+        """The init method for CommitKeyset, `cursor` is the result of `decode_cursor()` or `None` for the first page."""
+        self.per_page = per_page
+        queryset = queryset.order_by("-date", "-commit_hash")
+        if cursor is None:
+            commits = list(queryset[: per_page + 1])
+            self.offset, self.has_newer, self.has_older = 0, False, len(commits) > per_page
+            self.commits = commits[:per_page]
+            return
+
+        offset, direction, date, commit_hash = cursor
+        if direction == OLDER:
+            queryset = queryset.filter(Q(date__lt=date) | Q(date=date, commit_hash__lt=commit_hash))
+            commits = list(queryset[: per_page + 1])
+            self.offset, self.has_newer, self.has_older = offset, True, len(commits) > per_page
+            self.commits = commits[:per_page]
+        else:
+            queryset = queryset.filter(Q(date__gt=date) | Q(date=date, commit_hash__gt=commit_hash))
+            commits = list(queryset.reverse()[: per_page + 1])
+            self.has_newer, self.has_older = len(commits) > per_page, True
+            self.offset = max(offset, 0) if self.has_newer else 0
+            self.commits = commits[:per_page][::-1]
+
+    def older_cursor(self):
+        """Returns the cursor of the next page of older commits, or `None` if this is the last page."""
+        if not self.has_older or not self.commits:
+            return None
+        return encode_cursor(self.offset + len(self.commits), OLDER, self.commits[-1])
+
+    def newer_cursor(self):
+        """Returns the cursor of the previous page of newer commits, or `None` if this is the first page."""
+        if not self.has_newer or not self.commits:
+            return None
+        return encode_cursor(self.offset - self.per_page, NEWER, self.commits[0])
+
+
+class KeysetPaginator(EnhancedPaginator):
+    """
+    KeysetPaginator pages over a table of commits with cursors, see `tables.CommitTable.paginate()`.
+
+    Pages are requested with a cursor in the `page` query parameter rather than a page number, and the
+    total count comes from `CommitQuerySet.count()`, which is cached.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        """The init method for KeysetPaginator, `object_list` are the rows of a table of commits."""
+        super().__init__(object_list, per_page, **kwargs)
+        self.rows = object_list
+
+    @property
+    def count(self):
+        """Returns the number of commits in the table."""
+        return self.rows.data.data.count()
+
+    @property
+    def num_pages(self):
+        """Returns the number of pages."""
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    def page(self, number):
+        """Returns the page at the cursor `number`, or the first page if it is not a valid cursor."""
+        keyset = CommitKeyset(self.rows.data.data, decode_cursor(str(number)), self.per_page)
+        if keyset.offset and not keyset.commits:
+            raise EmptyPage("That page contains no results")
+        return KeysetPage(keyset, self)
+
+
+class KeysetPage:
+    """KeysetPage is a page of a KeysetPaginator, with the interface of `EnhancedPage` used by the templates."""
+
+    def __init__(self, keyset, paginator):
+        """The init method for KeysetPage."""
+        self.keyset = keyset
+        self.paginator = paginator
+        self.object_list = BoundRows(data=keyset.commits, table=paginator.rows.table)
+        self.number = keyset.offset // paginator.per_page + 1
+
+    def __len__(self):
+        """Returns the number of commits on the page."""
+        return len(self.keyset.commits)
+
+    def has_next(self):  # noqa: D102
+        return self.keyset.older_cursor() is not None
+
+    def has_previous(self):  # noqa: D102
+        return self.keyset.newer_cursor() is not None
+
+    def has_other_pages(self):  # noqa: D102
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):  # noqa: D102
+        return self.keyset.older_cursor()
+
+    def previous_page_number(self):  # noqa: D102
+        return self.keyset.newer_cursor()
+
+    def start_index(self):  # noqa: D102
+        return self.keyset.offset + 1 if self.keyset.commits else 0
+
+    def end_index(self):  # noqa: D102
+        return self.keyset.offset + len(self.keyset.commits)
+
+    def smart_pages(self):
+        """Pages are only linked to from their neighbours, there are no page numbers to list."""
+        return []
+
+
+class CommitKeysetPagination(OptionalLimitOffsetPagination):
+    """
+    CommitKeysetPagination pages over commits in the REST API with a `cursor` query parameter.
+
+    Responses keep the `count`, `next`, `previous` and `results` fields of the default pagination.
+    Requests with an `offset` are paginated with offsets, as before.
+    """
+
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Returns the page of commits at the requested cursor."""
+        self.keyset = None
+        if "text/csv" in request.accepted_media_type or self.offset_query_param in request.query_params:
+            return super().paginate_queryset(queryset, request, view=view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if not self.limit:
+            return super().paginate_queryset(queryset, request, view=view)
+        self.count = self.get_count(queryset)
+        cursor = decode_cursor(request.query_params.get(self.cursor_query_param, ""))
+        self.keyset = CommitKeyset(queryset, cursor, self.limit)
+        return self.keyset.commits
+
+    def get_next_link(self):  # noqa: D102
+        if self.keyset is None:
+            return super().get_next_link()
+        return self._cursor_link(self.keyset.older_cursor())
+
+    def get_previous_link(self):  # noqa: D102
+        if self.keyset is None:
+            return super().get_previous_link()
+        return self._cursor_link(self.keyset.newer_cursor())
+
+    def _cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+class PagedTableData(TableData):
+    """
+    PagedTableData is the data of a table whose rows are read one page at a time, e.g. from Dolt system tables.
+
+    Subclasses implement `__len__()`, without reading the rows, and `_rows(offset, limit)`. Rows are
+    always in the order of `_rows()`, tables using this data are not orderable.
+    """
+
+    page_size = 1000
+
+    def __init__(self):
+        """The init method for PagedTableData."""
+        super().__init__(data=None)
+
+    def __len__(self):
+        """Returns the number of rows."""
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        """Slicing returns a list of rows, indexing returns a single row."""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if stop <= start:
+                return []
+            rows = self._rows(start, stop - start)
+            return rows[::step] if step != 1 else rows
+        rows = self._rows(key, 1)
+        if not rows:
+            raise IndexError(key)
+        return rows[0]
+
+    def __iter__(self):
+        """Iterates over every row, reading `page_size` rows at a time."""
+        for offset in range(0, len(self), self.page_size):
+            yield from self._rows(offset, self.page_size)
+
+    def order_by(self, aliases):
+        """Rows are always in the order of `_rows()`."""
+
+    def _rows(self, offset, limit):
+        """Returns `limit` rows starting at `offset`."""
+        raise NotImplementedError
@@ -0,0 +1,66 @@
+"""Procedures.py calls Dolt stored procedures and functions, such as `dolt_commit` and `dolt_merge_base`.
+
+Arguments are always bound as query parameters, so the statement text of a call only depends on the
+procedure and its number of arguments, and arguments never need to be quoted or escaped. Each call
+sends the `procedure_called` signal with its duration, and is counted in `procedure_call_stats()`.
+"""
+
+import re
+import threading
+import time
+
+from django.db import connections
+
+from nautobot_version_control.signals import procedure_called
+
+# Procedure and function names are part of the statement text, so they are validated.
+_NAME_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Number of calls and total duration in seconds, per procedure.
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def call(procedure, *args, using="default"):
+    """
+    Calls the Dolt stored procedure `procedure` with `args` and returns the first row of its result.
+
+    :param procedure: the name of the procedure, e.g. "dolt_commit"
+    :param args: the arguments of the procedure, e.g. "--message", msg
+    :param using: the database alias to call the procedure on
+    :return: the first result row, or `None` if there is none
+    """
+    return _execute(procedure, f"CALL {_statement(procedure, args)};", args, using)
+
+
+def function(name, *args, using="default"):
+    """Returns the result of the Dolt function `name` called with `args`, e.g. `function("dolt_merge_base", a, b)`."""
+    row = _execute(name, f"SELECT {_statement(name, args)};", args, using)
+    return row[0] if row else None
+
+
+def procedure_call_stats():
+    """Returns a dict mapping the procedures called by this process to their number of calls and total duration in seconds."""
+    with _stats_lock:
+        return {procedure: tuple(stats) for procedure, stats in _stats.items()}
+
+
+def _statement(name, args):
+    if not _NAME_RE.match(name):
+        raise ValueError(f"invalid Dolt procedure name: {name!r}")
+    return f"{name}({', '.join(['%s'] * len(args))})"
+
+
+def _execute(name, sql, args, using):
+    start = time.monotonic()
+    try:
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, [str(arg) for arg in args])
+            return cursor.fetchone() if cursor.description else None
+    finally:
+        duration = time.monotonic() - start
+        with _stats_lock:
+            stats = _stats.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+        procedure_called.send(sender=None, procedure=name, duration=duration, using=using)
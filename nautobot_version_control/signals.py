@@ -0,0 +1,10 @@
+"""Signals.py defines the signals sent by the Nautobot Version Control app."""
+
+from django.dispatch import Signal
+
+# Sent with the name of a branch (`branch`) after a commit, merge or revert moved the head of that branch.
+branch_head_moved = Signal()
+
+# Sent after a Dolt stored procedure or function was called, with its name (`procedure`), the
+# duration of the call in seconds (`duration`) and the database alias it was called on (`using`).
+procedure_called = Signal()
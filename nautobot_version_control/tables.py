@@ -3,15 +3,21 @@
 # pylint: disable=too-few-public-methods
 
 import django_tables2 as tables
+from django.utils.html import format_html
 from django_tables2 import A
 from nautobot.core.tables import BaseTable, ButtonsColumn, ToggleColumn
+from nautobot.core.templatetags.helpers import placeholder
 
+from nautobot_version_control import graph
 from nautobot_version_control.models import (
     Branch,
     Commit,
     Conflicts,
+    MergeCandidate,
     PullRequest,
+    format_ahead_behind,
 )
+from nautobot_version_control.pagination import KeysetPaginator
 
 __all__ = ("BranchTable", "ConflictsSummaryTable", "CommitTable", "PullRequestTable")
 
@@ -59,7 +65,9 @@ class BranchTable(BaseTable):
         buttons=("checkout",),
         prepend_template=BRANCH_TABLE_BADGES,
     )
-    ahead_behind = tables.Column(accessor=A("ahead_behind"), verbose_name="Ahead / Behind")
+    # accessing `name` rather than the `ahead_behind` property avoids a per-row computation,
+    # the counts for all rendered rows are computed at once in `render_ahead_behind()`
+    ahead_behind = tables.Column(accessor=A("name"), verbose_name="Ahead / Behind", orderable=False)
     starting_branch = tables.Column(accessor=A("source_branch"), verbose_name="Starting Branch")
 
     class Meta(BaseTable.Meta):
@@ -90,6 +98,21 @@ class BranchTable(BaseTable):
             "actions",
         )
 
+    def __init__(self, *args, **kwargs):
+        """The init method for BranchTable."""
+        super().__init__(*args, **kwargs)
+        self._ahead_behind = None
+
+    def render_ahead_behind(self, record):
+        """Renders the ahead/behind counts, computed in bulk for the current page."""
+        if self._ahead_behind is None:
+            page = getattr(self, "page", None)
+            records = [row.record for row in page.object_list] if page else list(self.data)
+            self._ahead_behind = graph.ahead_behind(records)
+        if record.name not in self._ahead_behind:
+            self._ahead_behind.update(graph.ahead_behind([record]))
+        return format_ahead_behind(*self._ahead_behind[record.name])
+
 
 #
 # Commits
@@ -115,6 +138,15 @@ class CommitTable(BaseTable):
             "commit_hash",
         )
         default_columns = fields
+        # commits are paginated on their (date, commit_hash) order, see `paginate()`
+        orderable = False
+
+    def paginate(self, paginator_class=None, per_page=None, page=1, *args, **kwargs):
+        """Paginates the commits with a cursor from the `page` query parameter, see `pagination.KeysetPaginator`."""
+        request = getattr(self, "request", None)
+        if request is not None:
+            page = request.GET.get(self.prefixed_page_field, page)
+        return super().paginate(KeysetPaginator, per_page, page, *args, **kwargs)
 
 
 class CommitRevertTable(BaseTable):  # pylint: disable=nb-sub-class-name
@@ -227,8 +259,12 @@ class PullRequestTable(BaseTable):
     status = tables.TemplateColumn(
         template_code=PR_STATUS_BADGES,
         verbose_name="Status",
+        # annotated by `PullRequestQuerySet.with_status()`
+        order_by=("computed_status",),
     )
     title = tables.LinkColumn()
+    # the counts for all rendered rows are read at once in `render_conflicts()`
+    conflicts = tables.Column(accessor=A("pk"), verbose_name="Conflicts", orderable=False)
 
     class Meta(BaseTable.Meta):
         """Metaclass attributes of PullRequestTable."""
@@ -238,9 +274,34 @@ class PullRequestTable(BaseTable):
             "pk",
             "title",
             "status",
+            "conflicts",
             "source_branch",
             "destination_branch",
             "creator",
             "created_at",
         )
         default_columns = fields
+
+    def __init__(self, *args, **kwargs):
+        """The init method for PullRequestTable."""
+        super().__init__(*args, **kwargs)
+        self._conflicts = None
+
+    def render_conflicts(self, record):
+        """Renders the number of merge conflicts of an open pull request, read in bulk for the current page."""
+        if not record.open:
+            return placeholder(None)
+        if self._conflicts is None:
+            page = getattr(self, "page", None)
+            records = [row.record for row in page.object_list] if page else list(self.data)
+            self._conflicts = MergeCandidate.conflict_counts(records)
+        if record.pk not in self._conflicts:
+            self._conflicts.update(MergeCandidate.conflict_counts([record]))
+        count = self._conflicts[record.pk]
+        if count is None:
+            return format_html(
+                '<span class="text-muted" title="Merge conflicts have not been computed yet">&hellip;</span>'
+            )
+        if count:
+            return format_html('<span class="label label-danger">{}</span>', count)
+        return format_html('<span class="label label-success">{}</span>', count)
@@ -0,0 +1,18 @@
+"""Tasks.py contains the Celery tasks of the Nautobot Version Control app."""
+
+from nautobot.core.celery import nautobot_task
+
+from nautobot_version_control.autocommit import flush_if_due
+from nautobot_version_control.merge import build_merge_candidate
+
+
+@nautobot_task
+def build_merge_candidate_task(src_name, dest_name, key=None):
+    """Builds a merge candidate in a Celery worker, scheduled by `merge.schedule_merge_candidate()`."""
+    build_merge_candidate(src_name, dest_name, key)
+
+
+@nautobot_task
+def flush_auto_commit_task(branch):
+    """Commits the pending changes of `branch` in a Celery worker, scheduled by `autocommit.schedule_flush()`."""
+    flush_if_due(branch)
@@ -0,0 +1,49 @@
+"""Tests for the diff result cache."""
+
+import unittest
+
+from nautobot_version_control.diff_cache import LocalDiffCache
+
+FROM_COMMIT = "a" * 32
+TO_COMMIT = "b" * 32
+
+
+class TestLocalDiffCache(unittest.TestCase):
+    """TestLocalDiffCache tests the LRU eviction of LocalDiffCache."""
+
+    def test_evicts_least_recently_used_entry(self):
+        """test_evicts_least_recently_used_entry asserts that max_entries is enforced in LRU order."""
+        diff_cache = LocalDiffCache(max_entries=2)
+        diff_cache.set(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows", ["d1"])
+        diff_cache.set(FROM_COMMIT, TO_COMMIT, "dcim_site", "rows", ["s1"])
+        # touch the device entry so that the site entry is the least recently used
+        self.assertEqual(diff_cache.get(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows"), ["d1"])
+        diff_cache.set(FROM_COMMIT, TO_COMMIT, "dcim_rack", "rows", ["r1"])
+
+        self.assertIsNone(diff_cache.get(FROM_COMMIT, TO_COMMIT, "dcim_site", "rows"))
+        self.assertEqual(diff_cache.get(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows"), ["d1"])
+        self.assertEqual(diff_cache.get(FROM_COMMIT, TO_COMMIT, "dcim_rack", "rows"), ["r1"])
+
+    def test_evicts_by_size(self):
+        """test_evicts_by_size asserts that max_size bounds the number of cached rows."""
+        diff_cache = LocalDiffCache(max_size=3)
+        diff_cache.set(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows", ["d1", "d2"])
+        diff_cache.set(FROM_COMMIT, TO_COMMIT, "dcim_site", "rows", ["s1", "s2"])
+
+        self.assertIsNone(diff_cache.get(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows"))
+        self.assertEqual(diff_cache.size, 2)
+
+    def test_caches_only_commit_hashes(self):
+        """test_caches_only_commit_hashes asserts that diffs between branch names are not cached."""
+        diff_cache = LocalDiffCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return ["row"]
+
+        diff_cache.get_or_compute(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows", compute)
+        diff_cache.get_or_compute(FROM_COMMIT, TO_COMMIT, "dcim_device", "rows", compute)
+        diff_cache.get_or_compute("main", "feature", "dcim_device", "rows", compute)
+        diff_cache.get_or_compute("main", "feature", "dcim_device", "rows", compute)
+        self.assertEqual(len(calls), 3)
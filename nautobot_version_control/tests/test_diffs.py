@@ -0,0 +1,152 @@
+"""Tests for incremental diffs."""
+
+import threading
+import unittest
+from unittest import mock
+
+from nautobot_version_control import diffs
+from nautobot_version_control.diff_cache import LocalDiffCache
+from nautobot_version_control.diffs import DiffTableData, fold_payloads
+
+FROM_COMMIT = "a" * 32
+PREV_COMMIT = "b" * 32
+TO_COMMIT = "c" * 32
+
+
+def payload(diff_type, pk, from_name=None, to_name=None):
+    """Returns a diff payload of a row with a `name` column."""
+    return {
+        "root": "from" if diff_type == "removed" else "to",
+        "diff_type": diff_type,
+        "from_id": None if diff_type == "added" else pk,
+        "from_name": from_name,
+        "to_id": None if diff_type == "removed" else pk,
+        "to_name": to_name,
+    }
+
+
+class TestFoldPayloads(unittest.TestCase):
+    """TestFoldPayloads tests that folding two consecutive diffs gives the diff over both."""
+
+    def fold(self, base, delta):
+        """Folds the diffs from FROM_COMMIT to PREV_COMMIT and from PREV_COMMIT to TO_COMMIT."""
+        return {p["to_id"] or p["from_id"]: p for p in fold_payloads(base, delta, FROM_COMMIT, TO_COMMIT)}
+
+    def test_unrelated_changes_are_kept(self):
+        """test_unrelated_changes_are_kept asserts that rows changed in only one of the diffs are kept as is."""
+        folded = self.fold([payload("added", "1", to_name="a")], [payload("removed", "2", from_name="b")])
+        self.assertEqual(folded["1"]["diff_type"], "added")
+        self.assertEqual(folded["2"]["diff_type"], "removed")
+        self.assertEqual(folded["2"]["root"], "from")
+        self.assertEqual({p["from_commit"] for p in folded.values()}, {FROM_COMMIT})
+        self.assertEqual({p["to_commit"] for p in folded.values()}, {TO_COMMIT})
+
+    def test_added_then_removed(self):
+        """test_added_then_removed asserts that a row added then removed is not part of the diff."""
+        folded = self.fold([payload("added", "1", to_name="a")], [payload("removed", "1", from_name="a")])
+        self.assertEqual(folded, {})
+
+    def test_added_then_modified(self):
+        """test_added_then_modified asserts that a row added then modified is added with its latest values."""
+        folded = self.fold([payload("added", "1", to_name="a")], [payload("modified", "1", "a", "b")])
+        self.assertEqual(folded["1"]["diff_type"], "added")
+        self.assertIsNone(folded["1"]["from_id"])
+        self.assertEqual(folded["1"]["to_name"], "b")
+
+    def test_modify_chain(self):
+        """test_modify_chain asserts that a row modified twice goes from its first to its last values."""
+        folded = self.fold([payload("modified", "1", "a", "b")], [payload("modified", "1", "b", "c")])
+        self.assertEqual(folded["1"]["diff_type"], "modified")
+        self.assertEqual((folded["1"]["from_name"], folded["1"]["to_name"]), ("a", "c"))
+
+    def test_modified_back(self):
+        """test_modified_back asserts that a row modified back to its original values is not part of the diff."""
+        folded = self.fold([payload("modified", "1", "a", "b")], [payload("modified", "1", "b", "a")])
+        self.assertEqual(folded, {})
+
+    def test_modified_then_removed(self):
+        """test_modified_then_removed asserts that a row modified then removed is removed with its original values."""
+        folded = self.fold([payload("modified", "1", "a", "b")], [payload("removed", "1", from_name="b")])
+        self.assertEqual(folded["1"]["diff_type"], "removed")
+        self.assertEqual(folded["1"]["root"], "from")
+        self.assertEqual(folded["1"]["from_name"], "a")
+
+    def test_removed_then_added(self):
+        """test_removed_then_added asserts that a row removed then added again with other values is modified."""
+        folded = self.fold([payload("removed", "1", from_name="a")], [payload("added", "1", to_name="b")])
+        self.assertEqual(folded["1"]["diff_type"], "modified")
+        self.assertEqual((folded["1"]["from_name"], folded["1"]["to_name"]), ("a", "b"))
+
+
+def page(tbl_name, from_commit, to_commit, offset, limit):  # pylint: disable=unused-argument
+    """Returns the numbers of the changed rows of a diff of 1523 rows in the page at `offset`."""
+    return list(range(offset, min(offset + limit, 1523)))
+
+
+@mock.patch.object(diffs, "rows_for_payloads", side_effect=lambda model, payloads, *_: payloads)
+@mock.patch.object(diffs, "diff_payloads", side_effect=page)
+@mock.patch.object(diffs, "diff_summary_for_table", return_value={"added": 1500, "modified": 20, "removed": 3})
+class TestDiffTableData(unittest.TestCase):
+    """TestDiffTableData tests that the rows of a diff table are read one page at a time."""
+
+    def data(self):
+        """Returns the diff table data of a model between FROM_COMMIT and TO_COMMIT."""
+        content_type = mock.Mock(**{"model_class.return_value._meta.db_table": "dcim_device"})
+        return DiffTableData(content_type, FROM_COMMIT, TO_COMMIT)
+
+    def test_length_from_summary(self, _, payloads, __):
+        """test_length_from_summary asserts that the number of rows is counted without reading them."""
+        self.assertEqual(len(self.data()), 1523)
+        payloads.assert_not_called()
+
+    def test_slice_reads_page(self, _, payloads, __):
+        """test_slice_reads_page asserts that a slice only reads its own rows."""
+        data = self.data()
+        self.assertEqual(data[1000:1050], list(range(1000, 1050)))
+        payloads.assert_called_once_with("dcim_device", FROM_COMMIT, TO_COMMIT, 1000, 50)
+        self.assertEqual(data[1600:1700], [])
+        self.assertEqual(data[7], 7)
+
+    def test_iteration(self, _, payloads, __):
+        """test_iteration asserts that iterating reads every row, one page at a time."""
+        self.assertEqual(list(self.data()), list(range(1523)))
+        self.assertEqual(payloads.call_count, 2)
+
+
+@mock.patch.object(diffs, "get_app_setting", {"diff_incremental": True, "diff_incremental_max_rows": 2}.get)
+@mock.patch.object(diffs, "incremental_base", return_value=None)
+class TestIncrementalSummary(unittest.TestCase):
+    """TestIncrementalSummary tests the summaries of incremental diffs without an earlier diff to build on."""
+
+    def setUp(self):
+        """setUp runs before every test case."""
+        self.cache = LocalDiffCache()
+        patcher = mock.patch.object(diffs, "get_diff_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.object(diffs, "_diff_payloads", return_value=[payload("added", "1", to_name="a")])
+    @mock.patch.object(diffs, "_diff_summary_for_table", return_value={"added": 1, "modified": 0, "removed": 0})
+    def test_small_diff_keeps_rows(self, *_):
+        """test_small_diff_keeps_rows asserts that a small diff is counted in SQL and its rows are kept."""
+        summary = diffs.diff_summary_for_table("dcim_device", FROM_COMMIT, TO_COMMIT)
+        self.assertEqual(summary, {"added": 1, "modified": 0, "removed": 0})
+        self.assertEqual(len(self.cache.get(FROM_COMMIT, TO_COMMIT, "dcim_device", "payloads")), 1)
+
+    @mock.patch.object(diffs, "_diff_payloads")
+    @mock.patch.object(diffs, "_diff_summary_for_table", return_value={"added": 5, "modified": 0, "removed": 0})
+    def test_large_diff_is_counted(self, _, payloads, __):
+        """test_large_diff_is_counted asserts that the rows of a large diff are neither read nor kept."""
+        self.assertEqual(diffs.diff_summary_for_table("dcim_device", FROM_COMMIT, TO_COMMIT)["added"], 5)
+        payloads.assert_not_called()
+        self.assertIsNone(self.cache.get(FROM_COMMIT, TO_COMMIT, "dcim_device", "payloads"))
+
+    def test_concurrent_heads(self, _):
+        """test_concurrent_heads asserts that heads recorded by concurrent requests are all kept."""
+        heads = [f"{index:032d}" for index in range(diffs.DIFF_HEADS)]
+        threads = [threading.Thread(target=diffs.record_diff_head, args=(FROM_COMMIT, head)) for head in heads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(set(self.cache.get(FROM_COMMIT, "*", "*", "heads")), set(heads))
@@ -2,17 +2,48 @@
 
 # pylint: disable=too-many-ancestors
 
-from django.db import connection
+from copy import deepcopy
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, connections
 from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from nautobot.core.testing import APITestCase, APIViewTestCases
-from nautobot.dcim.models import Manufacturer
+from nautobot.dcim.models import Manufacturer, Platform
 from nautobot.users.models import User
 
+from nautobot_version_control import autocommit, diff_cache, diffs, graph, procedures
 from nautobot_version_control.constants import DOLT_DEFAULT_BRANCH
-from nautobot_version_control.merge import get_conflicts_count_for_merge
-from nautobot_version_control.models import Branch, Commit, PullRequest, PullRequestReview
-from nautobot_version_control.utils import active_branch
+from nautobot_version_control.merge import (
+    get_conflicts_count_for_merge,
+    get_merge_candidate,
+    get_or_make_merge_candidate,
+)
+from nautobot_version_control.models import (
+    Branch,
+    BranchMeta,
+    Commit,
+    CommitChange,
+    MergeCandidate,
+    PullRequest,
+    PullRequestReview,
+)
+from nautobot_version_control.procedures import procedure_call_stats
+from nautobot_version_control.utils import (
+    active_branch,
+    active_branch_cache,
+    checked_out_branch,
+    close_revision_connections,
+    db_for_branch,
+    db_for_commit,
+    revision_database_stats,
+    table_columns,
+)
 
 
 @override_settings(DATABASE_ROUTERS=["nautobot_version_control.routers.GlobalStateRouter"])
@@ -69,6 +100,104 @@ class TestBranches(DoltTestCase):
         Branch(name="another", starting_branch=self.default).save()
         self.assertEqual(Branch.objects.filter(name="another").count(), 1)
 
+    def test_checked_out_branch_tracking(self):
+        """test_checked_out_branch_tracking asserts that checkouts are tracked until the connection is recycled."""
+        Branch(name="tracked", starting_branch=self.default).save()
+        Branch.objects.get(name="tracked").checkout()
+        self.assertEqual(checked_out_branch(), "tracked")
+        self.assertEqual(active_branch(), "tracked")
+
+        # a new connection starts on the default branch, so the tracked branch is forgotten
+        connection.close()
+        connection.ensure_connection()
+        self.assertIsNone(checked_out_branch())
+
+    def test_active_branch_cache(self):
+        """test_active_branch_cache asserts that active_branch() is memoized and follows checkouts."""
+        Branch(name="memoized", starting_branch=self.default).save()
+        with active_branch_cache():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(active_branch(), self.default)
+                self.assertEqual(active_branch(), self.default)
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+            Branch.objects.get(name="memoized").checkout()
+            self.assertEqual(active_branch(), "memoized")
+
+    def test_revision_database_eviction(self):
+        """test_revision_database_eviction asserts that the least recently used idle revision database alias is evicted."""
+        hashes = list(Commit.objects.values_list("commit_hash", flat=True)[:4])
+        self.assertEqual(len(hashes), 4)
+        plugins_config = deepcopy(settings.PLUGINS_CONFIG)
+        plugins_config["nautobot_version_control"]["max_revision_databases"] = 2
+        with self.settings(PLUGINS_CONFIG=plugins_config):
+            Manufacturer.objects.using(db_for_commit(hashes[0])).count()
+            for commit_hash in hashes[1:3]:
+                db_for_commit(commit_hash)
+
+            # the least recently used alias has an open connection, so the next one is evicted
+            self.assertIn(hashes[0], connections.databases)
+            self.assertNotIn(hashes[1], connections.databases)
+            self.assertIn(hashes[2], connections.databases)
+            self.assertGreaterEqual(Manufacturer.objects.using(hashes[0]).count(), 0)
+
+            close_revision_connections()
+            db_for_commit(hashes[3])
+            self.assertNotIn(hashes[0], connections.databases)
+            self.assertIn(hashes[2], connections.databases)
+            self.assertIn(hashes[3], connections.databases)
+            self.assertEqual(revision_database_stats()[0], 2)
+
+    def test_db_for_branch(self):
+        """test_db_for_branch asserts that queries on a branch database alias leave the default connection as is."""
+        Branch(name="scoped", starting_branch=self.default).save()
+        using = db_for_branch("scoped")
+        Manufacturer.objects.using(using).create(name="scoped-manufacturer")
+
+        self.assertEqual(active_branch(), self.default)
+        self.assertFalse(Manufacturer.objects.filter(name="scoped-manufacturer").exists())
+        self.assertTrue(Manufacturer.objects.using(using).filter(name="scoped-manufacturer").exists())
+        close_revision_connections()
+
+    def test_table_columns_per_commit(self):
+        """test_table_columns_per_commit asserts that cached table columns follow the schema of each commit."""
+        Branch(name="schema", starting_branch=self.default).save()
+        using = db_for_branch("schema")
+        self.assertNotIn("vc_test", table_columns("dcim_manufacturer"))
+        with connections[using].cursor() as cursor:
+            cursor.execute("ALTER TABLE dcim_manufacturer ADD COLUMN vc_test int")
+        commit = procedures.call("dolt_commit", "--all", "--message", "add a column", using=using)[0]
+
+        self.assertIn("vc_test", table_columns("dcim_manufacturer", using=db_for_commit(commit)))
+        self.assertIn("to_vc_test", table_columns("dolt_commit_diff_dcim_manufacturer", using=db_for_commit(commit)))
+        self.assertNotIn("vc_test", table_columns("dcim_manufacturer"))
+        close_revision_connections()
+
+    def test_branch_meta_prefetch(self):
+        """test_branch_meta_prefetch asserts that with_meta() loads the metadata of every branch in one query."""
+        for name in ("meta-1", "meta-2"):
+            Branch(name=name, starting_branch=self.default).save()
+            BranchMeta.objects.create(branch=name, source_branch=self.default, author=self.user)
+
+        with CaptureQueriesContext(connections["global"]) as ctx:
+            branches = list(Branch.objects.with_meta().filter(name__startswith="meta-"))
+            for branch in branches:
+                self.assertEqual(branch.created_by.username, self.user.username)
+                self.assertEqual(branch.source_branch, self.default)
+                self.assertIsNotNone(branch.created_at)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(len(branches), 2)
+        BranchMeta.objects.filter(branch__startswith="meta-").delete()
+
+    def test_procedure_arguments_are_bound(self):
+        """test_procedure_arguments_are_bound asserts that procedure arguments need no quoting and that calls are counted."""
+        calls = procedure_call_stats().get("dolt_commit", (0, 0.0))[0]
+        commit = Commit(message="""commit with 'single' and "double" quotes""")
+        commit.save(user=self.user)
+
+        self.assertEqual(Commit.objects.get(commit_hash=commit.commit_hash).message, commit.message)
+        self.assertEqual(procedure_call_stats()["dolt_commit"][0], calls + 1)
+
     def test_delete_with_pull_requests(self):
         """test_delete_with_pull_requests tests that deleting a branch cannot happen unless you delete a branch first."""
         Branch(name="todelete", starting_branch=self.default).save()
@@ -129,6 +258,51 @@ class TestBranches(DoltTestCase):
         # Verify the the main branch has the data
         self.assertEqual(Manufacturer.objects.filter(name="m1").count(), 1)
 
+    def test_merge_with_pending_changes(self):
+        """test_merge_with_pending_changes asserts that the batched changes of both branches are committed before a merge."""
+        Branch(name="batched", starting_branch=self.default).save()
+        main = Branch.objects.get(name=self.default)
+        other = Branch.objects.get(name="batched")
+        plugins_config = deepcopy(settings.PLUGINS_CONFIG)
+        plugins_config["nautobot_version_control"]["auto_commit_batch_size"] = 100
+        with self.settings(PLUGINS_CONFIG=plugins_config):
+            for branch, name in ((other.name, "pending-source"), (main.name, "pending-destination")):
+                manufacturer = Manufacturer.objects.using(db_for_branch(branch)).create(name=name)
+                objects = [("created", "dcim.manufacturer", str(manufacturer.pk))]
+                changes = {("created", Manufacturer): [1, [name]]}
+                self.assertFalse(autocommit.defer_commit(branch, changes, objects, self.user))
+            close_revision_connections()
+
+            main.checkout()
+            main.merge(other, user=self.user)
+
+        self.assertTrue(Manufacturer.objects.filter(name="pending-source").exists())
+        messages = list(Commit.objects.values_list("message", flat=True))
+        self.assertIn("Created 1 manufacturer: pending-source", messages)
+        self.assertIn("Created 1 manufacturer: pending-destination", messages)
+
+    def test_recorded_changes_are_committed(self):
+        """test_recorded_changes_are_committed asserts that the changes of an automatic commit are recorded in that commit."""
+        Branch(name="recorded", starting_branch=self.default).save()
+        main_head = Branch.objects.get(name=self.default).hash
+        using = db_for_branch("recorded")
+        plugins_config = deepcopy(settings.PLUGINS_CONFIG)
+        plugins_config["nautobot_version_control"]["auto_commit_batch_size"] = 100
+        with self.settings(PLUGINS_CONFIG=plugins_config):
+            manufacturer = Manufacturer.objects.using(using).create(name="recorded")
+            objects = [("created", "dcim.manufacturer", str(manufacturer.pk))]
+            changes = {("created", Manufacturer): [1, ["recorded"]]}
+            autocommit.defer_commit("recorded", changes, objects, self.user, force=True)
+
+        commit = Commit.objects.using(using).get(message="Created 1 manufacturer: recorded")
+        self.assertEqual([str(change) for change in commit.changes], [f"Created dcim.manufacturer {manufacturer.pk}"])
+        # nothing is left uncommitted on the branch, and main is untouched
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT table_name FROM dolt_status")
+            self.assertNotIn(CommitChange._meta.db_table, [row[0] for row in cursor.fetchall()])
+        self.assertEqual(Branch.objects.get(name=self.default).hash, main_head)
+        close_revision_connections()
+
     def test_merge_no_ff(self):
         """test_merge_no_ff tests whether a non-ff merge works."""
         Branch(name="noff", starting_branch=self.default).save()
@@ -155,6 +329,24 @@ class TestBranches(DoltTestCase):
         self.assertEqual(Manufacturer.objects.filter(name="m2").count(), 1)
         self.assertEqual(Manufacturer.objects.filter(name="m3").count(), 1)
 
+    def test_ahead_behind(self):
+        """test_ahead_behind tests the bulk ahead/behind computation against the default branch."""
+        Branch(name="ahead", starting_branch=self.default).save()
+        Branch.objects.get(name="ahead").checkout()
+        Manufacturer.objects.create(name="ahead-1")
+        Commit(message="commit ahead-1").save(user=self.user)
+
+        Branch.objects.get(name=self.default).checkout()
+        Manufacturer.objects.create(name="behind-1")
+        Commit(message="commit behind-1").save(user=self.user)
+
+        counts = graph.ahead_behind(Branch.objects.filter(name__in=[self.default, "ahead"]))
+        self.assertEqual(counts[self.default], (0, 0))
+        self.assertEqual(counts["ahead"], (1, 1))
+        self.assertEqual(
+            Commit.merge_base(self.default, "ahead"), procedures.function("dolt_merge_base", self.default, "ahead")
+        )
+
     def test_merge_conflicts(self):
         """test_merge_conflicts tests whether a merge with conflicts is detected and errors."""
         main = Branch.objects.get(name=self.default)
@@ -186,6 +378,50 @@ class TestBranches(DoltTestCase):
         self.assertEqual(get_conflicts_count_for_merge(other, main), 1)
         main.checkout()  # need this because of post truncate action with TransactionTests
 
+    def test_merge_candidate_freshness(self):
+        """test_merge_candidate_freshness asserts that a merge candidate is stale once the head of its source branch moves."""
+        Branch(name="fresh", starting_branch=self.default).save()
+        src = Branch.objects.get(name="fresh")
+        main = Branch.objects.get(name=self.default)
+        merge_candidate = get_or_make_merge_candidate(src, main)
+        main.checkout()
+        self.assertEqual(get_merge_candidate(src, main), merge_candidate)
+
+        src.checkout()
+        Manufacturer.objects.create(name="fresh-manufacturer")
+        Commit(message="move the head of fresh").save(user=self.user)
+        main.checkout()
+        src = Branch.objects.get(name="fresh")
+        self.assertIsNone(get_merge_candidate(src, main))
+
+    def test_merge_candidates_are_not_committed(self):
+        """test_merge_candidates_are_not_committed asserts that commits on main leave merge candidates out."""
+        Branch(name="uncommitted", starting_branch=self.default).save()
+        get_or_make_merge_candidate(Branch.objects.get(name="uncommitted"), Branch.objects.get(name=self.default))
+        Branch.objects.get(name=self.default).checkout()
+        Manufacturer.objects.create(name="committed-manufacturer")
+        Commit(message="commit next to a merge candidate").save(user=self.user)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT table_name FROM dolt_status")
+            uncommitted = [row[0] for row in cursor.fetchall()]
+        self.assertIn(MergeCandidate._meta.db_table, uncommitted)
+        self.assertNotIn(Manufacturer._meta.db_table, uncommitted)
+
+    def test_merge_candidate_background_build(self):
+        """test_merge_candidate_background_build asserts that missing merge candidates are scheduled rather than built inline."""
+        Branch(name="background", starting_branch=self.default).save()
+        src = Branch.objects.get(name="background")
+        main = Branch.objects.get(name=self.default)
+
+        plugins_config = deepcopy(settings.PLUGINS_CONFIG)
+        plugins_config["nautobot_version_control"]["merge_candidate_builder"] = "inline"
+        with self.settings(PLUGINS_CONFIG=plugins_config):
+            # the first lookup schedules a build and reports the conflicts as pending
+            self.assertIsNone(get_conflicts_count_for_merge(src, main, build=False))
+            self.assertEqual(get_conflicts_count_for_merge(src, main, build=False), 0)
+        self.assertEqual(active_branch(), self.default)
+
 
 @override_settings(DATABASE_ROUTERS=["nautobot_version_control.routers.GlobalStateRouter"])
 class TestApp(DoltApiTestCase):
@@ -283,6 +519,83 @@ class TestPullRequestApi(DoltApiTestCase, APIViewTestCases):
         self.assertEqual(data["count"], 3)
 
 
+class TestDiffs(DoltTestCase):
+    """TestDiffs tests the diffs between commits."""
+
+    def setUp(self):
+        """setUp runs before every test case."""
+        self.user = User.objects.get_or_create(username="diff-test", is_superuser=True)[0]
+
+    @mock.patch.object(diff_cache, "_diff_cache", diff_cache.NullDiffCache())
+    def test_parallel_summaries(self):
+        """test_parallel_summaries asserts that summaries computed by worker threads match the sequential ones."""
+        from_commit = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
+        Manufacturer.objects.create(name="diff-m1")
+        Manufacturer.objects.create(name="diff-m2")
+        Platform.objects.create(name="diff-p1")
+        Commit(message="diff changes").save(user=self.user)
+        to_commit = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
+
+        summaries = {}
+        for parallelism in (0, 4):
+            plugins_config = deepcopy(settings.PLUGINS_CONFIG)
+            plugins_config["nautobot_version_control"]["diff_parallelism"] = parallelism
+            with self.settings(PLUGINS_CONFIG=plugins_config):
+                summaries[parallelism] = diffs.two_dot_diffs(from_commit=from_commit, to_commit=to_commit)
+        close_revision_connections()
+
+        self.assertEqual(summaries[4], summaries[0])
+        self.assertEqual(
+            {diff["name"]: diff["added"] for diff in summaries[0]}, {"Manufacturer Diffs": 2, "Platform Diffs": 1}
+        )
+
+    @mock.patch.object(diff_cache, "_diff_cache", diff_cache.NullDiffCache())
+    def test_changed_tables(self):
+        """test_changed_tables asserts that only the tables with data changes between two commits are diffed."""
+        from_commit = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
+        Manufacturer.objects.create(name="changed-m1")
+        Commit(message="changed tables").save(user=self.user)
+        to_commit = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
+
+        self.assertIn(Manufacturer._meta.db_table, diffs.changed_tables(from_commit, to_commit))
+        self.assertNotIn(Platform._meta.db_table, diffs.changed_tables(from_commit, to_commit))
+        with mock.patch.object(diffs, "diff_summaries_for_tables", wraps=diffs.diff_summaries_for_tables) as summaries:
+            self.assertEqual(
+                [diff["name"] for diff in diffs.two_dot_diffs(from_commit, to_commit)], ["Manufacturer Diffs"]
+            )
+        # the other registered tables are not queried at all
+        self.assertEqual(summaries.call_args[0][0], [Manufacturer._meta.db_table])
+        close_revision_connections()
+
+    @mock.patch.object(diff_cache, "_diff_cache", diff_cache.NullDiffCache())
+    def test_diff_rows(self):
+        """test_diff_rows asserts that changed rows are read at the side of the diff they exist on, with their diff."""
+        modified = Manufacturer.objects.create(name="rows-modified")
+        removed = Manufacturer.objects.create(name="rows-removed")
+        Commit(message="diff rows base").save(user=self.user)
+        from_commit = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
+        modified.description = "changed"
+        modified.save()
+        removed.delete()
+        added = Manufacturer.objects.create(name="rows-added")
+        Commit(message="diff rows").save(user=self.user)
+        to_commit = Branch.objects.get(name=DOLT_DEFAULT_BRANCH).hash
+
+        content_type = ContentType.objects.get_for_model(Manufacturer)
+        with CaptureQueriesContext(connection) as queries:
+            rows = {row.pk: row for row in diffs.diff_rows_for_table(content_type, from_commit, to_commit)}
+        # the diff table is read in a single scan
+        self.assertEqual(sum("FROM dolt_commit_diff_dcim_manufacturer" in query["sql"] for query in queries), 1)
+        self.assertEqual(set(rows), {modified.pk, removed.pk, added.pk})
+        self.assertEqual(rows[added.pk].diff["diff_type"], "added")
+        self.assertEqual(rows[removed.pk].diff["diff_type"], "removed")
+        self.assertEqual(rows[removed.pk].name, "rows-removed")
+        self.assertEqual(rows[modified.pk].diff["diff_type"], "modified")
+        self.assertEqual(rows[modified.pk].diff["from_description"], "")
+        self.assertEqual(rows[modified.pk].description, "changed")
+        close_revision_connections()
+
+
 @override_settings(DATABASE_ROUTERS=["nautobot_version_control.routers.GlobalStateRouter"])
 class TestPullRequests(DoltTestCase):
     """TestPullRequests tests the functionality of the PullRequest model."""
@@ -326,6 +639,51 @@ class TestPullRequests(DoltTestCase):
             PullRequest.objects.filter(source_branch=test_branch.name, destination_branch=self.default).count(),
         )
 
+    def test_no_commits_ahead(self):
+        """test_no_commits_ahead asserts that a pull request from a new branch has no commits and can be counted."""
+        Branch(name="empty", starting_branch=self.default).save()
+        pr = PullRequest.objects.create(
+            title="empty", source_branch="empty", destination_branch=self.default, creator=self.user
+        )
+        self.assertEqual(pr.num_commits, 0)
+        self.assertEqual(list(pr.commits), [])
+        self.assertEqual(Commit.objects.filter(commit_hash__in=set()).count(), 0)
+
+    def test_status_annotation(self):
+        """test_status_annotation asserts that with_status() computes the same status and review count as the properties."""
+        reviews = {
+            "open": [],
+            "in-review": [PullRequestReview.COMMENTED],
+            "approved": [PullRequestReview.BLOCKED, PullRequestReview.APPROVED, PullRequestReview.COMMENTED],
+            "blocked": [PullRequestReview.APPROVED, PullRequestReview.BLOCKED],
+        }
+        for title, states in reviews.items():
+            pr = PullRequest.objects.create(
+                title=title, source_branch="test", destination_branch=self.default, creator=self.user
+            )
+            for i, state in enumerate(states):
+                review = PullRequestReview.objects.create(pull_request=pr, reviewer=self.user, state=state)
+                PullRequestReview.objects.filter(pk=review.pk).update(reviewed_at=timezone.now() + timedelta(minutes=i))
+        PullRequest.objects.create(
+            title="merged",
+            state=PullRequest.MERGED,
+            source_branch="test",
+            destination_branch=self.default,
+            creator=self.user,
+        )
+
+        with CaptureQueriesContext(connections["global"]) as ctx:
+            annotated = list(PullRequest.objects.with_status())
+            statuses = {pr.title: (pr.status, pr.num_reviews) for pr in annotated}
+        self.assertEqual(len(ctx.captured_queries), 1)
+        for pr in PullRequest.objects.all():
+            self.assertEqual(statuses[pr.title], (pr.title, pr.num_reviews))
+            self.assertEqual(pr.status, pr.title)
+        self.assertEqual(
+            set(PullRequest.objects.with_status().filter(computed_status="blocked").values_list("title", flat=True)),
+            {"blocked"},
+        )
+
 
 @override_settings(DATABASE_ROUTERS=["nautobot_version_control.routers.GlobalStateRouter"])
 class TestPullRequestReviewsApi(DoltApiTestCase, APIViewTestCases):
@@ -379,3 +737,27 @@ class TestCommitsApi(DoltApiTestCase, APIViewTestCases):
         response = self.client.get(f"{url}?format=api", **self.header)
 
         self.assertEqual(response.status_code, 200)
+
+    def test_cursor_pagination(self):
+        """test_cursor_pagination asserts that following the cursors returns every commit once, newest first."""
+        url = reverse("plugins-api:nautobot_version_control-api:commit-list")
+        self.add_permissions(f"{self.model._meta.app_label}.view_{self.model._meta.model_name}")
+        for i in range(3):
+            Manufacturer.objects.create(name=f"manufacturer-{i}")
+            Commit(message=f"commit {i}").save(user=self.user)
+
+        hashes, link = [], f"{url}?limit=2"
+        while link:
+            response = self.client.get(link, **self.header)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["count"], Commit.objects.count())
+            hashes.extend(commit["commit_hash"] for commit in response.data["results"])
+            link = response.data["next"]
+        expected = Commit.objects.order_by("-date", "-commit_hash").values_list("commit_hash", flat=True)
+        self.assertEqual(hashes, list(expected))
+
+        # the previous page of the second page is the first page
+        response = self.client.get(f"{url}?limit=2", **self.header)
+        response = self.client.get(response.data["next"], **self.header)
+        response = self.client.get(response.data["previous"], **self.header)
+        self.assertEqual([commit["commit_hash"] for commit in response.data["results"]], hashes[:2])
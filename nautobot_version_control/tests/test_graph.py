@@ -0,0 +1,97 @@
+"""Tests for the commit graph index."""
+
+import unittest
+from unittest import mock
+
+from nautobot_version_control import graph as commit_graph
+from nautobot_version_control.graph import CommitGraph
+from nautobot_version_control.utils import is_commit_hash
+
+# a <- b <- c <- m <- f
+#       \        /
+#        d <- e
+ANCESTORS = [
+    ("a", None, 0),
+    ("b", "a", 0),
+    ("c", "b", 0),
+    ("d", "b", 0),
+    ("e", "d", 0),
+    ("m", "c", 0),
+    ("m", "e", 1),
+    ("f", "m", 0),
+]
+
+
+def commit_ancestors(commits=None):
+    """Returns the rows of `ANCESTORS` for `commits`, or all of them."""
+    return [row for row in ANCESTORS if commits is None or row[0] in commits]
+
+
+@mock.patch("nautobot_version_control.graph._commit_ancestors", side_effect=commit_ancestors)
+class TestCommitGraph(unittest.TestCase):
+    """TestCommitGraph tests merge base and ahead/behind queries over the commit graph index."""
+
+    def test_merge_base(self, _):
+        """test_merge_base asserts that the best common ancestor is found."""
+        graph = CommitGraph()
+        self.assertEqual(graph.merge_base("c", "e"), "b")
+        self.assertEqual(graph.merge_base("f", "e"), "e")
+        self.assertEqual(graph.merge_base("a", "a"), "a")
+
+    def test_ahead_behind(self, _):
+        """test_ahead_behind asserts that commits are counted on both sides of the merge base."""
+        graph = CommitGraph()
+        self.assertEqual(graph.ahead_behind("e", "c"), (2, 1))
+        self.assertEqual(graph.ahead_behind("f", "e"), (3, 0))
+        self.assertEqual(graph.ahead("e", "c"), {"d", "e"})
+
+    def test_incremental_update(self, ancestors):
+        """test_incremental_update asserts that only new commits are looked up once the graph is indexed."""
+        graph = CommitGraph()
+        graph.update(["f"])
+        ANCESTORS.append(("g", "e", 0))
+        try:
+            self.assertEqual(graph.ahead_behind("g", "f"), (1, 3))
+        finally:
+            ANCESTORS.pop()
+        ancestors.assert_called_with(["g"])
+        self.assertEqual(graph.generations["g"], graph.generations["e"] + 1)
+
+    def test_update_numbers_partially_indexed_heads(self, _):
+        """test_update_numbers_partially_indexed_heads asserts that a head with parents but no generation is numbered."""
+        graph = CommitGraph()
+        graph.parents["f"] = ("m",)
+        graph.update(["f"])
+        self.assertEqual(graph.generations["f"], 6)
+
+    @mock.patch("nautobot_version_control.graph.get_app_setting", return_value=3)
+    def test_index_is_bounded(self, *_):
+        """test_index_is_bounded asserts that the index of the process is replaced once it exceeds its limit."""
+        with mock.patch.object(commit_graph, "_commit_graph", None):
+            graph = commit_graph.commit_graph()
+            self.assertIs(commit_graph.commit_graph(), graph)
+            graph.update(["f"])
+            self.assertIsNot(commit_graph.commit_graph(), graph)
+
+
+class TestResolve(unittest.TestCase):
+    """TestResolve tests that revisions are resolved to commit hashes."""
+
+    commit = "0123456789abcdefghijklmnopqrstuv"
+
+    def test_is_commit_hash(self):
+        """test_is_commit_hash asserts that only 32 base32 characters are a commit hash."""
+        self.assertTrue(is_commit_hash(self.commit))
+        self.assertFalse(is_commit_hash("feature-branch-named-32-chars-xx"))
+        self.assertFalse(is_commit_hash(self.commit.upper()))
+        self.assertFalse(is_commit_hash(self.commit[:-1]))
+
+    @mock.patch.object(commit_graph, "_branch_head", return_value="h" * 32)
+    def test_branch_named_like_a_hash(self, _):
+        """test_branch_named_like_a_hash asserts that a branch named like a commit hash resolves to its head."""
+        self.assertEqual(commit_graph._resolve(self.commit), "h" * 32)
+
+    @mock.patch.object(commit_graph, "_branch_head", return_value=None)
+    def test_commit_hash(self, _):
+        """test_commit_hash asserts that a commit hash without a branch of that name resolves to itself."""
+        self.assertEqual(commit_graph._resolve(self.commit), self.commit)
@@ -0,0 +1,70 @@
+"""Tests for the conflict tables of merges and the scheduling of merge candidates."""
+
+import unittest
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from nautobot_version_control import merge
+from nautobot_version_control.merge import ConflictRowsData, schedule_merge_candidates
+
+
+def read_rows(table, offset, limit):
+    """Returns the (table, row number) of `limit` rows of `table` starting at `offset`."""
+    return [(table, number) for number in range(offset, offset + limit)]
+
+
+class TestConflictRowsData(unittest.TestCase):
+    """TestConflictRowsData tests that conflict rows are read one page at a time, table after table."""
+
+    def test_slice_across_tables(self):
+        """test_slice_across_tables asserts that a slice reads the rows of every table it spans."""
+        read = mock.Mock(side_effect=read_rows)
+        data = ConflictRowsData([("dcim_site", 3), ("dcim_device", 1500)], read)
+        self.assertEqual(len(data), 1503)
+        self.assertEqual(data[1:5], [("dcim_site", 1), ("dcim_site", 2), ("dcim_device", 0), ("dcim_device", 1)])
+        self.assertEqual(data[1003], ("dcim_device", 1000))
+        read.assert_called_with("dcim_device", 1000, 1)
+
+    def test_iteration(self):
+        """test_iteration asserts that iterating reads every row once."""
+        rows = list(ConflictRowsData([("dcim_site", 3), ("dcim_device", 1500)], read_rows))
+        self.assertEqual(len(rows), 1503)
+        self.assertEqual(len(set(rows)), 1503)
+
+    def test_read_error(self):
+        """test_read_error asserts that a table whose rows cannot be read shows no rows."""
+        data = ConflictRowsData([("dcim_site", 3)], mock.Mock(side_effect=Exception("branch not found")))
+        with self.assertLogs("nautobot_version_control.merge", level="ERROR"):
+            self.assertEqual(data[0:3], [])
+        self.assertEqual(len(data), 0)
+
+
+@mock.patch.object(merge, "schedule_merge_candidate")
+@mock.patch.object(merge, "Branch")
+@mock.patch.object(merge, "PullRequest")
+class TestScheduleMergeCandidates(unittest.TestCase):
+    """TestScheduleMergeCandidates tests the merge candidate builds scheduled when the head of a branch moves."""
+
+    def setUp(self):
+        """setUp runs before every test case."""
+        for target, value in (
+            ("cache", LocMemCache("test_schedule_merge_candidates", {})),
+            ("get_app_setting", {"merge_candidate_builder": "thread"}.get),
+        ):
+            patcher = mock.patch.object(merge, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_debounced_per_branch(self, pull_request, *_):
+        """test_debounced_per_branch asserts that the pull requests of a branch are looked up once per interval."""
+        schedule_merge_candidates(None, branch="feature")
+        schedule_merge_candidates(None, branch="feature")
+        schedule_merge_candidates(None, branch="other")
+        self.assertEqual(pull_request.objects.filter.call_count, 2)
+
+    def test_inline_builder(self, pull_request, *_):
+        """test_inline_builder asserts that builds are never made inline when the head of a branch moves."""
+        with mock.patch.object(merge, "get_app_setting", {"merge_candidate_builder": "inline"}.get):
+            schedule_merge_candidates(None, branch="feature")
+        pull_request.objects.filter.assert_not_called()
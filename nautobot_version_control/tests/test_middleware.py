@@ -0,0 +1,166 @@
+"""Tests for the automatic Dolt commit middleware."""
+
+import contextvars
+import threading
+import unittest
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError
+from nautobot.dcim.models import Manufacturer
+
+from nautobot_version_control import autocommit, middleware
+from nautobot_version_control.constants import AUTO_COMMIT_SAMPLE_SIZE, DOLT_BRANCH_KEYWORD, DOLT_DEFAULT_BRANCH
+from nautobot_version_control.middleware import (
+    AutoDoltCommit,
+    DoltBranchMiddleware,
+    handle_auto_dolt_commit_update,
+)
+from nautobot_version_control.models import BranchMeta, MergeCandidate
+
+
+class TestAutoDoltCommit(unittest.TestCase):
+    """TestAutoDoltCommit tests that changes are routed to the AutoDoltCommit of the current context."""
+
+    def test_changes_are_context_local(self):
+        """test_changes_are_context_local asserts that changes from another thread are not collected."""
+        collector = AutoDoltCommit(request=None)
+        with mock.patch.object(collector, "make_commits") as make_commits:
+            with collector:
+                handle_auto_dolt_commit_update(Manufacturer, Manufacturer(name="m1"), created=True)
+                # a new thread starts with an empty context, like a concurrent request
+                thread = threading.Thread(
+                    target=handle_auto_dolt_commit_update,
+                    args=(Manufacturer, Manufacturer(name="m2")),
+                    kwargs={"created": True},
+                )
+                thread.start()
+                thread.join()
+        make_commits.assert_called_once()
+        self.assertEqual(collector.changes_for_db, {None: {("created", Manufacturer): [1, ["m1"]]}})
+
+    def test_merge_candidates_are_ignored(self):
+        """test_merge_candidates_are_ignored asserts that saving a merge candidate makes no commit."""
+        collector = AutoDoltCommit(request=None)
+        with mock.patch.object(collector, "make_commits") as make_commits:
+            with collector:
+                handle_auto_dolt_commit_update(MergeCandidate, MergeCandidate(branch="xxx-merge-main-feature"))
+        make_commits.assert_not_called()
+        self.assertEqual(collector.changes_for_db, {})
+
+    def test_branch_meta_is_committed(self):
+        """test_branch_meta_is_committed asserts that the metadata of a new branch is committed."""
+        collector = AutoDoltCommit(request=None)
+        with mock.patch.object(collector, "make_commits") as make_commits:
+            with collector:
+                handle_auto_dolt_commit_update(BranchMeta, BranchMeta(branch="feature"), created=True)
+        make_commits.assert_called_once()
+        self.assertIn(("created", BranchMeta), next(iter(collector.changes_for_db.values())))
+
+    def test_changes_outside_a_request_are_ignored(self):
+        """test_changes_outside_a_request_are_ignored asserts that no change is collected once the context exits."""
+        collector = AutoDoltCommit(request=None)
+        with collector:
+            pass
+        contextvars.copy_context().run(handle_auto_dolt_commit_update, Manufacturer, Manufacturer(name="m1"))
+        self.assertFalse(collector.commit)
+        self.assertEqual(collector.changes_for_db, {})
+
+
+class TestAutoDoltCommitMessages(unittest.TestCase):
+    """TestAutoDoltCommitMessages tests that automatic commit messages stay small for bulk changes."""
+
+    def test_changes_are_aggregated(self):
+        """test_changes_are_aggregated asserts that changes are counted per model with a few object names."""
+        collector = AutoDoltCommit(request=None)
+        manufacturers = [Manufacturer(name=f"m{i}") for i in range(AUTO_COMMIT_SAMPLE_SIZE + 2)]
+        for manufacturer in manufacturers:
+            collector.collect_change(manufacturer, "updated")
+        # repeated changes of the same object are only counted once
+        collector.collect_change(manufacturers[0], "updated")
+
+        (count, names) = collector.changes_for_db[None][("updated", Manufacturer)]
+        self.assertEqual(count, AUTO_COMMIT_SAMPLE_SIZE + 2)
+        self.assertEqual(len(names), AUTO_COMMIT_SAMPLE_SIZE)
+        self.assertEqual(len(collector.objects_for_db[None]), AUTO_COMMIT_SAMPLE_SIZE + 2)
+        self.assertTrue(
+            AutoDoltCommit.change_msg("updated", Manufacturer, count, names).endswith(" and 2 more"),
+        )
+        self.assertEqual(AutoDoltCommit.change_msg("created", Manufacturer, 1, ["m1"]), "Created 1 manufacturer: m1")
+
+    def test_batched_commit_message(self):
+        """test_batched_commit_message asserts that a coalesced commit lists the changes and authors of every request."""
+        state = {
+            "requests": 2,
+            "authors": ["a <a@example.com>", "b <b@example.com>"],
+            "changes": {"updated:dcim.manufacturer": [2, ["m1", "m2"]]},
+        }
+        self.assertEqual(
+            autocommit.commit_message(state),
+            "Updated 2 manufacturers: m1, m2 (authors: a <a@example.com>, b <b@example.com>)",
+        )
+
+
+class TestDeferCommit(unittest.TestCase):
+    """TestDeferCommit tests that the pending changes of concurrent requests on a branch are all kept."""
+
+    @mock.patch.object(autocommit, "author_from_user", str)
+    @mock.patch.object(autocommit, "get_app_setting", {"auto_commit_batch_size": 1000}.get)
+    @mock.patch.object(autocommit, "CommitChange")
+    @mock.patch.object(autocommit, "cache", LocMemCache("test_defer_commit", {}))
+    def test_concurrent_requests(self, _):
+        """test_concurrent_requests asserts that concurrent requests do not overwrite each other's pending changes."""
+        threads = [
+            threading.Thread(
+                target=autocommit.defer_commit,
+                args=("feature", {("updated", Manufacturer): [1, [f"m{i}"]]}, [], f"user{i % 2}"),
+            )
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        state = autocommit.cache.get(autocommit._state_key("feature"))  # pylint: disable=protected-access
+        self.assertEqual(state["requests"], 20)
+        self.assertEqual(state["changes"]["updated:dcim.manufacturer"][0], 20)
+        self.assertEqual(sorted(state["authors"]), ["user0", "user1"])
+
+
+@mock.patch.object(middleware, "messages")
+@mock.patch.object(middleware, "redirect")
+@mock.patch.object(middleware, "set_checked_out_branch")
+@mock.patch.object(middleware, "checked_out_branch", return_value="feature")
+@mock.patch.object(middleware, "Branch")
+class TestDoltBranchMiddleware(unittest.TestCase):
+    """TestDoltBranchMiddleware tests that requests run on the branch of their session."""
+
+    def process_view(self, view):
+        """Processes a request on the "feature" branch with `view`, returns the request."""
+        request = mock.Mock(GET={}, headers={}, session={DOLT_BRANCH_KEYWORD: "feature"})
+        DoltBranchMiddleware(None).process_view(request, view, (), {})
+        return request
+
+    def test_checked_out_branch(self, branch, *_):
+        """test_checked_out_branch asserts that the branch already checked out is neither looked up nor checked out."""
+        view = mock.Mock()
+        self.process_view(view)
+        view.assert_called_once()
+        branch.objects.get.assert_not_called()
+        branch.objects.filter.assert_not_called()
+
+    def test_deleted_branch(self, branch, _, set_checked_out_branch, redirect, messages):
+        """test_deleted_branch asserts that a checked out branch deleted by another process falls back to main."""
+        branch.objects.filter.return_value.exists.return_value = False
+        request = self.process_view(mock.Mock(side_effect=DatabaseError("branch not found")))
+        self.assertEqual(request.session[DOLT_BRANCH_KEYWORD], DOLT_DEFAULT_BRANCH)
+        set_checked_out_branch.assert_called_once_with(None)
+        redirect.assert_called_once_with(request.path)
+        messages.warning.assert_called_once()
+
+    def test_database_error(self, branch, *_):
+        """test_database_error asserts that database errors on an existing branch are raised."""
+        branch.objects.filter.return_value.exists.return_value = True
+        with self.assertRaises(DatabaseError):
+            self.process_view(mock.Mock(side_effect=DatabaseError("deadlock")))
@@ -0,0 +1,17 @@
+"""Tests for the models of the version control app."""
+
+import importlib
+import unittest
+
+from nautobot.extras.registry import registry
+
+
+class TestModelRegistration(unittest.TestCase):
+    """TestModelRegistration tests that the models register their Nautobot features."""
+
+    def test_pull_request_webhooks(self):
+        """test_pull_request_webhooks asserts that the models import and pull requests support webhooks."""
+        models = importlib.import_module("nautobot_version_control.models")
+        webhooks = registry["model_features"]["webhooks"]["nautobot_version_control"]
+        self.assertIn(models.PullRequest._meta.model_name, webhooks)
+        self.assertIn(models.PullRequestReview._meta.model_name, webhooks)
@@ -53,6 +53,11 @@ urlpatterns = [
     ),
     # Diffs
     path("diffs/", views.ActiveBranchDiffs.as_view(), name="active_branch_diffs"),
+    path(
+        "diffs/<str:from_commit>/<str:to_commit>/<str:app_label>/<str:model>/",
+        views.DiffTableView.as_view(),
+        name="diff_table",
+    ),
     # Pull Requests
     path("pull-request/", views.PullRequestListView.as_view(), name="pull_request_list"),
     path(
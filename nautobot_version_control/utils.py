@@ -1,11 +1,36 @@
 """Utility methods used throughout the plugin."""
 
+import threading
+import weakref
+from collections import OrderedDict
 from contextlib import contextmanager
+from contextvars import ContextVar
 from copy import deepcopy
 
+from django.conf import settings
 from django.db import connection, connections
 
-from nautobot_version_control.constants import DB_NAME, DOLT_BRANCH_KEYWORD
+from nautobot_version_control import procedures
+from nautobot_version_control.constants import COMMIT_HASH_RE, DB_NAME, DOLT_BRANCH_KEYWORD
+
+# Memoized result of `active_branch()`, scoped to a request by `active_branch_cache()`.
+# Outside of such a scope the value is `None` and nothing is memoized.
+_active_branch_scope = ContextVar("dolt_active_branch_scope", default=None)
+
+# Column names of introspected tables, keyed on (schema version, commit of a revision database or None, table name).
+# The schema version is bumped after every migration by `invalidate_schema_cache()`.
+_schema_cache = {}
+# The cache is cleared once it holds this many tables, e.g. after diffs of many commits.
+SCHEMA_CACHE_MAX_ENTRIES = 4096
+_schema_version = 0
+_schema_lock = threading.Lock()
+
+# Revision database aliases registered by `db_for_commit()` and `db_for_branch()`, least recently used first.
+_revision_aliases = OrderedDict()
+_revision_lock = threading.Lock()
+# Connections to revision databases, across all threads and for the current thread.
+_revision_connections = weakref.WeakSet()
+_revision_local = threading.local()
 
 
 class DoltError(Exception):
@@ -28,6 +53,16 @@ def author_from_user(user):
     return "unknown <unknown@nautobot.invalid>"
 
 
+def get_app_setting(name, default=None):
+    """Returns the setting `name` from `PLUGINS_CONFIG["nautobot_version_control"]`."""
+    return settings.PLUGINS_CONFIG.get("nautobot_version_control", {}).get(name, default)
+
+
+def is_commit_hash(commit):
+    """Returns `True` if `commit` (a string or Commit) is a full Dolt commit hash rather than e.g. a branch name."""
+    return COMMIT_HASH_RE.fullmatch(str(commit)) is not None
+
+
 def is_dolt_model(model):
     """Returns `True` if `instance` is an instance of a model from the Dolt plugin."""
     app_label = model._meta.app_label
@@ -41,31 +76,208 @@ def alter_session_branch(sess=None, branch=None):
     sess[DOLT_BRANCH_KEYWORD] = branch
 
 
+def checked_out_branch(conn=None):
+    """Returns the branch last checked out on `conn`, or `None` if it is unknown.
+
+    The branch is tracked on the Django connection wrapper, so it lives exactly as long
+    as the persistent database connection does (see `reset_checked_out_branch`).
+    """
+    conn = conn if conn is not None else connection
+    return getattr(conn, "dolt_checked_out_branch", None)
+
+
+def set_checked_out_branch(branch, conn=None):
+    """Records `branch` as the branch currently checked out on `conn`."""
+    conn = conn if conn is not None else connection
+    conn.dolt_checked_out_branch = str(branch) if branch is not None else None
+
+
+def reset_checked_out_branch(sender=None, connection=None, **kwargs):  # pylint: disable=W0613,W0621
+    """Forgets the tracked branch of a connection, connected to the `connection_created` signal.
+
+    A freshly (re)opened connection always starts on the default branch of the database,
+    so whatever was tracked for the previous connection no longer applies.
+    """
+    if connection is not None:
+        set_checked_out_branch(None, conn=connection)
+
+
+def checkout_branch(branch):
+    """Checks out `branch` on the default connection and tracks it."""
+    branch = str(branch)
+    try:
+        procedures.call("dolt_checkout", branch)
+    except Exception:
+        # the branch the connection ended up on is unknown
+        set_checked_out_branch(None)
+        cache_active_branch(None)
+        raise
+    set_checked_out_branch(branch)
+    cache_active_branch(branch)
+
+
+@contextmanager
+def active_branch_cache():
+    """Memoizes `active_branch()` for the duration of the block, e.g. a single request."""
+    token = _active_branch_scope.set({})
+    try:
+        yield
+    finally:
+        _active_branch_scope.reset(token)
+
+
+def cache_active_branch(branch):
+    """Stores `branch` as the memoized active branch, or invalidates the memo if `branch` is `None`."""
+    scope = _active_branch_scope.get()
+    if scope is None:
+        return
+    if branch is None:
+        scope.pop("branch", None)
+    else:
+        scope["branch"] = str(branch)
+
+
 def active_branch():
     """Returns the current active_branch from dolt."""
+    scope = _active_branch_scope.get()
+    if scope is not None and "branch" in scope:
+        return scope["branch"]
     with connection.cursor() as cursor:
         cursor.execute("SELECT active_branch();")
-        return cursor.fetchone()[0]
+        branch = cursor.fetchone()[0]
+    cache_active_branch(branch)
+    return branch
+
+
+def table_columns(table, using="default"):
+    """Returns the column names of `table` on the database `using`, as reported by DESCRIBE.
+
+    Results are cached until the next migration, see `invalidate_schema_cache()`. The revision databases
+    of commits never change and may have another schema, their columns are cached per commit.
+    """
+    version = _schema_version
+    key = (version, _schema_revision(using), table)
+    columns = _schema_cache.get(key)
+    if columns is None:
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DESCRIBE {table}")  # TODO: not safe
+            columns = tuple(col[0] for col in cursor.fetchall())
+        with _schema_lock:
+            if version == _schema_version:
+                if len(_schema_cache) >= SCHEMA_CACHE_MAX_ENTRIES:
+                    _schema_cache.clear()
+                _schema_cache[key] = columns
+    return columns
+
+
+def _schema_revision(using):
+    """Returns the commit hash of the revision database `using`, or `None` for other databases."""
+    revision = connections.databases[using].get("id")
+    return revision if revision is not None and is_commit_hash(revision) else None
+
+
+def invalidate_schema_cache():
+    """Forgets all cached table columns, called after migrations."""
+    global _schema_version  # pylint: disable=global-statement  # noqa: PLW0603
+    with _schema_lock:
+        _schema_version += 1
+        _schema_cache.clear()
 
 
 def db_for_commit(commit):
-    """Uses "database-revision" syntax adds a database entry for the commit e.g. "nautobot/3a5mqdgao8029bf8ji0huobbskq1n1l5"."""
+    """Uses "database-revision" syntax adds a database entry for the commit e.g. "nautobot/3a5mqdgao8029bf8ji0huobbskq1n1l5".
+
+    At most `max_revision_databases` aliases are registered at a time, registering another one
+    evicts the least recently used alias that has no open connection in any thread. Connections to
+    revision databases are closed at the end of each request, see `close_revision_connections()`.
+    """
     cm_hash = str(commit)
-    if len(cm_hash) != 32:  # noqa: PLR2004
+    if not is_commit_hash(cm_hash):
         raise Exception("commit hash length is incorrect")  # pylint: disable=broad-exception-raised  # TODO
-    database = deepcopy(connections.databases["default"])
-    database["id"] = cm_hash
-    database["NAME"] = f"{DB_NAME}/{cm_hash}"
-    connections.databases[cm_hash] = database
-    return cm_hash
+    return _register_revision_database(cm_hash, cm_hash)
+
+
+def db_for_branch(branch):
+    """Uses "database-revision" syntax adds a database entry for the branch e.g. "nautobot/feature".
+
+    Queries using the returned alias run on their own connection with `branch` checked out, so
+    nothing needs to be checked out on the shared default connection. Unlike commits, branches are
+    writable through their revision database, e.g. to merge or commit on that branch.
+    """
+    name = str(branch)
+    return _register_revision_database(f"{DOLT_BRANCH_KEYWORD}:{name}", name)
+
+
+def _register_revision_database(alias, revision):
+    """Registers the database alias `alias` for the revision database of `revision`, see `db_for_commit()`."""
+    max_aliases = get_app_setting("max_revision_databases")
+    evicted = []
+    with _revision_lock:
+        if alias in _revision_aliases:
+            _revision_aliases.move_to_end(alias)
+        else:
+            database = deepcopy(connections.databases["default"])
+            database["id"] = revision
+            database["NAME"] = f"{DB_NAME}/{revision}"
+            connections.databases[alias] = database
+            _revision_aliases[alias] = database
+        if max_aliases and len(_revision_aliases) > max_aliases:
+            # aliases with an open connection are in use by a thread, e.g. a diff worker
+            in_use = {conn.alias for conn in list(_revision_connections) if conn.connection is not None}
+            idle = [a for a in _revision_aliases if a != alias and a not in in_use]
+            for evicted_alias in idle[: len(_revision_aliases) - max_aliases]:
+                del _revision_aliases[evicted_alias]
+                connections.databases.pop(evicted_alias, None)
+                evicted.append(evicted_alias)
+    for evicted_alias in evicted:
+        close_revision_connections(alias=evicted_alias)
+    return alias
+
+
+def track_revision_connection(sender=None, connection=None, **kwargs):  # pylint: disable=W0613,W0621
+    """Records connections opened to revision databases, connected to the `connection_created` signal."""
+    if connection is None or "id" not in connection.settings_dict:
+        return
+    if not hasattr(_revision_local, "connections"):
+        _revision_local.connections = set()
+    _revision_local.connections.add(connection)
+    _revision_connections.add(connection)
+
+
+def close_revision_connections(sender=None, alias=None, **kwargs):  # pylint: disable=W0613
+    """Closes the revision database connections opened by the current thread.
+
+    Connected to the `request_finished` signal so that connections to revision databases do not
+    outlive the request that opened them. If `alias` is given only connections to it are closed.
+    """
+    for conn in list(getattr(_revision_local, "connections", ())):
+        if alias and conn.alias != alias:
+            continue
+        conn.close()
+        _revision_local.connections.discard(conn)
+        try:
+            del connections[conn.alias]
+        except AttributeError:
+            pass
+
+
+def revision_database_stats():
+    """Returns the number of registered revision database aliases and of open revision database connections."""
+    with _revision_lock:
+        aliases = len(_revision_aliases)
+    open_connections = sum(1 for conn in list(_revision_connections) if conn.connection is not None)
+    return aliases, open_connections
 
 
 @contextmanager
 def query_on_branch(branch):
-    """Checkout to another branch, runs a query, and checkouts back to main."""
-    # TODO: remove in favor of db_for_commit
-    with connection.cursor() as cursor:
-        prev = active_branch()
-        cursor.execute(f"""CALL dolt_checkout("{branch}");""")  # TODO: not safe
+    """Checks out another branch on the default connection for the duration of the block, then checks out the previous branch.
+
+    Prefer `db_for_branch()`, which does not change the state of the shared default connection.
+    """
+    prev = active_branch()
+    checkout_branch(branch)
+    try:
         yield
-        cursor.execute(f"""CALL dolt_checkout("{prev}");""")  # TODO: not safe
+    finally:
+        checkout_branch(prev)
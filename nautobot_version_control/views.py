@@ -5,18 +5,20 @@ from datetime import datetime
 
 from django.contrib import messages
 from django.contrib.contenttypes.models import ContentType
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_list_or_404, get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.html import format_html
 from django.views import View
+from django_tables2 import RequestConfig
 from nautobot.core.forms import ConfirmationForm
 from nautobot.core.utils.permissions import get_permission_for_model
 from nautobot.core.views import generic
 from nautobot.core.views.mixins import GetReturnURLMixin, ObjectPermissionRequiredMixin
+from nautobot.core.views.paginator import EnhancedPaginator, get_paginate_count
 from nautobot.dcim.models.locations import Location
 
-from nautobot_version_control import diffs, filters, forms, merge, tables
+from nautobot_version_control import diff_table_for_model, diffs, filters, forms, graph, merge, tables
 from nautobot_version_control.constants import DOLT_DEFAULT_BRANCH
 from nautobot_version_control.models import (
     Branch,
@@ -98,7 +100,7 @@ class BranchView(DoltObjectView):
 class BranchListView(generic.ObjectListView):
     """BranchListView renders a view of all branches."""
 
-    queryset = Branch.objects.exclude(name__startswith="xxx")
+    queryset = Branch.objects.with_meta().exclude(name__startswith="xxx")
     filterset = filters.BranchFilterSet
     filterset_form = forms.BranchFilterForm
     table = tables.BranchTable
@@ -322,11 +324,20 @@ class BranchMergePreView(GetReturnURLMixin, View):
         source_head = src.hash
         return {
             "results": diffs.two_dot_diffs(from_commit=merge_base_c, to_commit=source_head),
-            "conflicts": merge.get_conflicts_for_merge(src, dest),
+            "conflicts": paginate_conflicts(request, merge.get_conflicts_for_merge(src, dest)),
             "back_btn_url": reverse("plugins:nautobot_version_control:branch_merge", args=[src.name]),
         }
 
 
+def paginate_conflicts(request, conflicts):
+    """Paginates the conflict and constraint violation tables returned by `merge.get_conflicts_for_merge()`."""
+    for key in ("conflicts", "violations"):
+        if conflicts and key in conflicts:
+            paginate = {"paginator_class": EnhancedPaginator, "per_page": get_paginate_count(request)}
+            RequestConfig(request, paginate).configure(conflicts[key])
+    return conflicts
+
+
 #
 # Commits
 #
@@ -373,9 +384,10 @@ class CommitListView(generic.ObjectListView):
     def alter_queryset(self, request):  # noqa: D102
         if active_branch() != DOLT_DEFAULT_BRANCH:
             # only list commits on the current branch since the merge-base
-            merge_base_hash = Commit.merge_base(DOLT_DEFAULT_BRANCH, active_branch())
-            merge_base = Commit.objects.get(commit_hash=merge_base_hash)
-            self.queryset = self.queryset.filter(date__gt=merge_base.date)
+            hashes = graph.commits_ahead(active_branch(), DOLT_DEFAULT_BRANCH)
+            if not hashes:
+                return self.queryset.none()
+            self.queryset = self.queryset.filter(commit_hash__in=hashes)
         return self.queryset
 
     def extra_context(self):  # pylint: disable=W0613,C0116 # noqa: D102
@@ -618,6 +630,28 @@ class DiffDetailView(View):
         return json_obj
 
 
+class DiffTableView(View):
+    """DiffTableView renders a single page of a model's diff table, it is used to load diff panels on demand."""
+
+    template_name = "nautobot_version_control/diff_table.html"
+
+    def get(self, request, *args, **kwargs):  # pylint: disable=W0613,C0116 # noqa: D102
+        content_type = get_object_or_404(ContentType, app_label=kwargs["app_label"], model=kwargs["model"])
+        model = content_type.model_class()
+        if not model or not diff_table_for_model(model):
+            raise Http404
+        if not request.user.has_perm(get_permission_for_model(model, "view")):
+            return HttpResponseForbidden()
+
+        table = diffs.diff_table(content_type, kwargs["from_commit"], kwargs["to_commit"])
+        paginate = {
+            "paginator_class": EnhancedPaginator,
+            "per_page": get_paginate_count(request),
+        }
+        RequestConfig(request, paginate).configure(table)
+        return render(request, self.template_name, {"table": table})
+
+
 #
 # Pull Requests
 #
@@ -626,7 +660,7 @@ class DiffDetailView(View):
 class PullRequestListView(generic.ObjectListView):
     """PullRequestListView is used to render a list of pull requests."""
 
-    queryset = PullRequest.objects.all().order_by("-created_at")
+    queryset = PullRequest.objects.with_status().order_by("-created_at")
     filterset = filters.PullRequestDefaultOpenFilterSet
     filterset_form = forms.PullRequestFilterForm
     table = tables.PullRequestTable
@@ -637,14 +671,14 @@ class PullRequestListView(generic.ObjectListView):
 class PullRequestBase(DoltObjectView):
     """PullRequestBase contains the base information about a PullRequest."""
 
-    queryset = PullRequest.objects.all()
+    queryset = PullRequest.objects.with_status()
     actions = ()
 
     def get_extra_context(self, request, obj, **kwargs):  # pylint: disable=W0613,C0116,W0237 # noqa: D102
         src, dest = obj.get_src_dest_branches()
         return {
             "counts": {
-                "num_conflicts": merge.get_conflicts_count_for_merge(src, dest),
+                "num_conflicts": merge.get_conflicts_count_for_merge(src, dest, build=False),
                 "num_reviews": obj.num_reviews,
                 "num_commits": obj.num_commits,
             }
@@ -681,7 +715,7 @@ class PullRequestConflictView(PullRequestBase):
         ctx.update(
             {
                 "active_tab": "conflicts",
-                "conflicts": merge.get_conflicts_for_merge(src, dest),
+                "conflicts": paginate_conflicts(request, merge.get_conflicts_for_merge(src, dest, build=False)),
             }
         )
         return ctx
@@ -826,7 +860,7 @@ class PullRequestMergeView(generic.ObjectEditView):
                 "pull_request": pull_request,
                 "form": self.form,
                 "return_url": pull_request.get_absolute_url(),
-                "conflicts": merge.get_conflicts_for_merge(src, dest),
+                "conflicts": paginate_conflicts(request, merge.get_conflicts_for_merge(src, dest)),
                 "diffs": diffs.three_dot_diffs(from_commit=dest.hash, to_commit=src.hash),
             },
         )